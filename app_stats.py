@@ -0,0 +1,316 @@
+import os
+import re
+import sys
+import time
+
+import numpy as np
+from autogen_core.tools import FunctionTool
+
+from journal_index import iter_entries, to_iso
+
+SOURCE = "combine_files/combine/journal-app.txt"
+
+KINDS = ("food", "supplement", "med", "exercise")
+KEYWORDS = {
+    "food": ("food", "foods", "breakfast", "lunch", "dinner", "snack", "snacks", "meal", "meals",
+             "ate", "eat", "drink", "drinks"),
+    "supplement": ("supplement", "supplements", "supp", "supps", "vitamin", "vitamins"),
+    "med": ("med", "meds", "medication", "medications", "medicine", "medicines"),
+    "exercise": ("exercise", "exercises", "workout", "workouts", "activity", "activities", "sport"),
+}
+KIND_OF = {word: KINDS.index(kind) for kind, words in KEYWORDS.items() for word in words}
+
+# "08:30 Breakfast: oats, banana" / "- Supplements: magnesium 200mg; vitamin D"
+FIELD = re.compile(r'^\s*(?:[-*•]\s*)?(?:\d{1,2}[:.]\d{2}\s*(?:am|pm)?\s*[-–]?\s*)?([A-Za-z ]{2,24}?)\s*[:=]\s*(.+)$', re.I)
+RATING = re.compile(r'\b(?:rating|discomfort|pain|score)\b\D{0,12}?\b([1-4])\b', re.I)
+TIME = re.compile(r'\b(\d{1,2})[:.](\d{2})\s*(am|pm)?\b', re.I)
+SPLIT = re.compile(r'\s*(?:,|;|\+|/|\band\b|\bwith\b)\s*', re.I)
+UNITS = r'(?:mg|mcg|g|kg|ml|l|iu|x|cups?|tbsp|tsp|pcs?|min|mins|minutes?|h|hrs?|hours?|km|steps)'
+QUANTITY = re.compile(r'^(?:\d+(?:\.\d+)?\s*' + UNITS + r'?\b\s*(?:of\s+)?)+', re.I)
+TRAILING_QUANTITY = re.compile(r'(?:\s+\d+(?:\.\d+)?\s*' + UNITS + r'?\b\.?)+$', re.I)
+
+
+def store_path(source):
+    return os.path.splitext(source)[0] + ".npz"
+
+
+def parse_minute(match):
+    hour, minute, half = int(match.group(1)), int(match.group(2)), (match.group(3) or "").lower()
+    if half == "pm" and hour < 12:
+        hour += 12
+    if half == "am" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return -1
+    return hour * 60 + minute
+
+
+def normalize_item(value):
+    value = TIME.sub("", value)
+    value = QUANTITY.sub("", value.strip().lower())
+    value = TRAILING_QUANTITY.sub("", value)
+    value = re.sub(r'\([^)]*\)', "", value)
+    return re.sub(r'\s+', " ", value).strip(" .-")
+
+
+def parse_entry(text):
+    """Ratings and (kind, item, minute) tuples found in one day of the app journal."""
+    ratings = []
+    items = []
+    for line in text.splitlines():
+        ratings += [int(value) for value in RATING.findall(line)]
+        match = FIELD.match(line)
+        if not match:
+            continue
+        key = match.group(1).strip().lower()
+        kind = KIND_OF.get(key, KIND_OF.get(key.split()[-1] if key.split() else ""))
+        if kind is None:
+            continue
+        time_match = TIME.search(line)
+        minute = parse_minute(time_match) if time_match else -1
+        for value in SPLIT.split(match.group(2)):
+            name = normalize_item(value)
+            if name and not name.isdigit():
+                items.append((kind, name, minute))
+    return ratings, items
+
+
+def extract(source=SOURCE, output=None):
+    """Parse every dated entry of the app journal into a columnar .npz table.
+
+    Day columns: date, mean/max rating and rating count. Item columns (one row
+    per food, supplement, med or exercise mention): day row, kind, vocabulary
+    id and minute of day (-1 when no time was written).
+    """
+    start = time.perf_counter()
+    output = output or store_path(source)
+    dates, rating_mean, rating_max, rating_count = [], [], [], []
+    item_day, item_kind, item_id, item_minute = [], [], [], []
+    vocab = {}
+    for row, (iso_date, body) in enumerate(iter_entries(source)):
+        ratings, items = parse_entry(body)
+        dates.append(iso_date)
+        rating_mean.append(sum(ratings) / len(ratings) if ratings else np.nan)
+        rating_max.append(max(ratings) if ratings else 0)
+        rating_count.append(len(ratings))
+        for kind, name, minute in items:
+            item_day.append(row)
+            item_kind.append(kind)
+            item_id.append(vocab.setdefault(name, len(vocab)))
+            item_minute.append(minute)
+
+    st = os.stat(source)
+    tmp_output = output + ".tmp.npz"
+    np.savez_compressed(
+        tmp_output,
+        dates=np.array(dates, dtype="datetime64[D]"),
+        rating_mean=np.array(rating_mean, dtype=np.float32),
+        rating_max=np.array(rating_max, dtype=np.int8),
+        rating_count=np.array(rating_count, dtype=np.int16),
+        item_day=np.array(item_day, dtype=np.int32),
+        item_kind=np.array(item_kind, dtype=np.int8),
+        item_id=np.array(item_id, dtype=np.int32),
+        item_minute=np.array(item_minute, dtype=np.int16),
+        vocab=np.array(list(vocab), dtype=str),
+        source=np.array([st.st_size, st.st_mtime_ns], dtype=np.int64),
+    )
+    os.replace(tmp_output, output)
+    print(f"extracted {len(dates)} days, {len(item_id)} items ({len(vocab)} distinct) into {output} "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return output
+
+
+def load(source=SOURCE):
+    """The columnar table for `source`, re-extracted first if the journal changed since."""
+    output = store_path(source)
+    st = os.stat(source)
+    if os.path.isfile(output):
+        data = dict(np.load(output))
+        if data["source"].tolist() == [st.st_size, st.st_mtime_ns]:
+            return data
+    extract(source, output)
+    return dict(np.load(output))
+
+
+def pearson(x, y):
+    # Column-wise correlation of every column of x with y.
+    xc = x - x.mean(axis=0)
+    yc = y - y.mean()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (yc @ xc) / (np.sqrt((xc ** 2).sum(axis=0)) * np.sqrt((yc ** 2).sum()))
+
+
+class AppStats:
+    def __init__(self, data, start_date=None, end_date=None):
+        dates = data["dates"]
+        keep = np.ones(len(dates), dtype=bool)
+        if start_date:
+            keep &= dates >= np.datetime64(start_date)
+        if end_date:
+            keep &= dates <= np.datetime64(end_date)
+        rows = np.flatnonzero(keep)
+        remap = np.full(len(dates), -1, dtype=np.int64)
+        remap[rows] = np.arange(len(rows))
+
+        items = keep[data["item_day"]] if len(data["item_day"]) else np.zeros(0, dtype=bool)
+        self.vocab = data["vocab"]
+        self.dates = dates[rows]
+        self.rating = data["rating_mean"][rows].astype(np.float64)
+        self.item_day = remap[data["item_day"][items]]
+        self.item_id = data["item_id"][items]
+        self.item_minute = data["item_minute"][items]
+        # Bit k is set when the item was listed under KINDS[k]; an item can be under several.
+        self.kinds = np.zeros(len(self.vocab), dtype=np.uint8)
+        np.bitwise_or.at(self.kinds, data["item_id"], (1 << data["item_kind"].astype(np.uint8)).astype(np.uint8))
+
+        # Day x item presence matrix.
+        self.present = np.zeros((len(self.dates), len(self.vocab)), dtype=bool)
+        self.present[self.item_day, self.item_id] = True
+
+    def kind_names(self, k):
+        return "/".join(kind for i, kind in enumerate(KINDS) if self.kinds[k] & (1 << i))
+
+    def median_minutes(self):
+        minutes = np.full(len(self.vocab), -1, dtype=np.int64)
+        timed = self.item_minute >= 0
+        order = np.argsort(self.item_id[timed], kind="stable")
+        ids, values = self.item_id[timed][order], self.item_minute[timed][order]
+        for item, chunk in zip(*np.unique(ids, return_index=True)):
+            end = np.searchsorted(ids, item, side="right")
+            minutes[item] = int(np.median(values[chunk:end]))
+        return minutes
+
+    def lagged(self, max_lag):
+        """Per-item correlation with the rating `lag` calendar days later, for each lag."""
+        rated = ~np.isnan(self.rating)
+        correlations = []
+        for lag in range(max_lag + 1):
+            if lag == 0:
+                x, y = self.present[rated], self.rating[rated]
+            else:
+                pairs = (self.dates[lag:] - self.dates[:-lag]) == np.timedelta64(lag, "D")
+                pairs &= rated[lag:]
+                x, y = self.present[:-lag][pairs], self.rating[lag:][pairs]
+            if len(y) < 3:
+                correlations.append(np.full(len(self.vocab), np.nan))
+            else:
+                correlations.append(pearson(x.astype(np.float64), y))
+        return np.vstack(correlations) if correlations else np.zeros((0, len(self.vocab)))
+
+    def item_table(self, max_lag=2):
+        rated = ~np.isnan(self.rating)
+        x = self.present[rated].astype(np.float64)
+        r = self.rating[rated]
+        days = self.present.sum(axis=0)
+        rated_days = x.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_with = (r @ x) / rated_days
+            mean_without = (r.sum() - r @ x) / (len(r) - rated_days)
+        next_day = np.full(len(self.vocab), np.nan)
+        pairs = (self.dates[1:] - self.dates[:-1]) == np.timedelta64(1, "D")
+        pairs &= rated[1:] & rated[:-1]
+        if pairs.any():
+            change = self.rating[1:][pairs] - self.rating[:-1][pairs]
+            xp = self.present[:-1][pairs].astype(np.float64)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                next_day = (change @ xp) / xp.sum(axis=0) - change.mean()
+        return {"days": days, "mean_with": mean_with, "delta": mean_with - mean_without,
+                "next_day_delta": next_day, "lags": self.lagged(max_lag), "minute": self.median_minutes()}
+
+    def pairs(self, candidates, top, min_days):
+        """Pairs among `candidates` seen together on at least `min_days` days whose mean
+        rating together is furthest from the overall mean, with their day count."""
+        if len(candidates) < 2:
+            return []
+        rated = ~np.isnan(self.rating)
+        x = self.present[:, candidates].astype(np.int32)
+        counts = x.T @ x
+        with np.errstate(invalid="ignore", divide="ignore"):
+            xr = x[rated].astype(np.float64)
+            mean = (xr * self.rating[rated][:, None]).T @ xr / (xr.T @ xr)
+        i, j = np.triu_indices(len(candidates), k=1)
+        keep = (counts[i, j] >= min_days) & (counts[i, j] < rated.sum()) & ~np.isnan(mean[i, j])
+        i, j = i[keep], j[keep]
+        order = np.argsort(-np.abs(mean[i, j] - self.rating[rated].mean()), kind="stable")[:top]
+        return [(candidates[i[k]], candidates[j[k]], int(counts[i[k], j[k]]), mean[i[k], j[k]]) for k in order]
+
+
+def fmt(value, digits=2):
+    return "-" if value is None or np.isnan(value) else f"{value:+.{digits}f}"
+
+
+def fmt_minute(minute):
+    return "-" if minute < 0 else f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def report(data, kind="", item="", start_date=None, end_date=None, top=15, min_days=3, max_lag=2):
+    stats = AppStats(data, start_date, end_date)
+    rated = stats.rating[~np.isnan(stats.rating)]
+    if len(stats.dates) == 0:
+        return "no entries in range"
+    lines = [f"days {len(stats.dates)} ({stats.dates[0]}..{stats.dates[-1]}), rated {len(rated)}, "
+             f"mean rating {rated.mean() if len(rated) else float('nan'):.2f} (1-4)"]
+    if len(stats.vocab) == 0:
+        return lines[0] + "\nno foods/supplements/meds/exercise found"
+
+    table = stats.item_table(max_lag)
+    selected = table["days"] >= min_days
+    if kind:
+        if kind not in KINDS:
+            return f"unknown kind {kind!r}, use one of {', '.join(KINDS)}"
+        selected &= (stats.kinds & (1 << KINDS.index(kind))) != 0
+    if item:
+        selected &= np.char.find(stats.vocab, item.strip().lower()) >= 0
+    candidates = np.flatnonzero(selected)
+    order = candidates[np.argsort(-np.nan_to_num(np.abs(table["delta"][candidates])), kind="stable")][:top]
+
+    lag_names = " ".join(f"r_lag{lag}" for lag in range(max_lag + 1))
+    lines.append(f"kind | item | days | mean_rating_with | delta_vs_without | next_day_change | {lag_names} | median_time")
+    for k in order:
+        lags = " ".join(fmt(value) for value in table["lags"][:, k])
+        lines.append(f"{stats.kind_names(k)} | {stats.vocab[k]} | {int(table['days'][k])} | "
+                     f"{table['mean_with'][k]:.2f} | {fmt(table['delta'][k])} | {fmt(table['next_day_delta'][k])} | "
+                     f"{lags} | {fmt_minute(table['minute'][k])}")
+    if not len(order):
+        lines.append("(no items seen on at least %d days)" % min_days)
+
+    pairs = stats.pairs(candidates[np.argsort(-table["days"][candidates], kind="stable")][:50], top, min_days)
+    if pairs:
+        lines.append("pair | days together | mean_rating_together")
+        for a, b, count, mean in pairs:
+            lines.append(f"{stats.vocab[a]} + {stats.vocab[b]} | {count} | {mean:.2f}")
+    return "\n".join(lines)
+
+
+class StatsTool(FunctionTool):
+    def __init__(self, source: str = SOURCE):
+        description = ("Returns exact statistics computed from the structured app journal: for each food, "
+                       "supplement, med or exercise the number of days, mean discomfort rating (1-4) on those days, "
+                       "the difference to days without it, the next-day rating change, rating correlations at "
+                       "0..max_lag day lags, the usual time of day, and the co-occurring pairs whose ratings stand out most. "
+                       "Filter with kind (food, supplement, med, exercise), an item substring and "
+                       "start_date/end_date (YYYY-MM-DD).")
+        super().__init__(name="Journal_Stats", description=description, func=self.getstats)
+        self.source = source
+
+    def getstats(self, kind: str = "", item: str = "", start_date: str = "", end_date: str = "",
+                 top: int = 15, min_days: int = 3, max_lag: int = 2) -> str:
+        if not os.path.isfile(self.source):
+            return f"error {self.source} not found"
+        try:
+            return report(load(self.source), kind, item, to_iso(start_date), to_iso(end_date),
+                          top, min_days, max(0, min(max_lag, 7)))
+        except Exception as e:
+            return f"Error computing stats for {self.source}: {str(e)}"
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else SOURCE
+    if not os.path.isfile(source):
+        print(f"File not found: {source}")
+        return
+    extract(source)
+
+
+if __name__ == "__main__":
+    main()
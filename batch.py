@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from teams import DATA_DIR, DEFAULT_TEAM, TEAMS
+
+OUT_DIR = "batch_output"
+CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# A profile directory can hold its own task for the coordinator.
+TASK_FILE = "task.txt"
+
+
+def profile_names(profiles):
+    """Output directory names for `profiles`: their base names, made unique."""
+    names, seen = [], {}
+    for profile in profiles:
+        name = os.path.basename(os.path.normpath(profile)) or "profile"
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}-{seen[name]}")
+    return names
+
+
+def profile_task(profile, default):
+    path = os.path.join(profile, TASK_FILE)
+    if os.path.isfile(path):
+        with open(path, encoding='utf-8') as file:
+            return file.read().strip() or default
+    return default
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2)
+
+
+async def run_profile(profile, name, team_name, task, clients, out_dir, run_id, full=False):
+    """Combines one profile's journals and runs the team on them, writing
+    plan.md, summary.json and result.json (and the trace) to `out_dir`/`name`."""
+    from budgets import budget_stop, write_summary
+    from combine_engine import refresh
+    from fanout import run_fanout, run_mode
+    from run_team import build_team, run_chat
+    from telemetry import Tracer, tracing_enabled
+
+    directory = os.path.join(out_dir, name)
+    os.makedirs(directory, exist_ok=True)
+    result = {"profile": profile, "name": name, "team": team_name, "run_id": run_id, "error": None}
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(refresh, None, full, None, profile)
+        result["combine_seconds"] = time.perf_counter() - start
+        team = build_team(team_name, tracer=Tracer(run_id=run_id), clients=clients,
+                          data_dir=os.path.join(profile, DATA_DIR))
+        task = profile_task(profile, task or team.spec["task"])
+        await team.prepare()
+        if run_mode() == "fanout":
+            reply = await run_fanout(team.coordinator, team.analysts, task, tracer=team.tracer, usage=team.usage)
+            summary = team.summary([reply], budget_stop(team.usage))
+        else:
+            run = await run_chat(team, task, console=False)
+            summary = team.summary(run.messages, run.stop_reason)
+        await team.save_findings()
+        result.update({key: summary[key] for key in ("stop_reason", "complete", "stopped_by", "usage")})
+        result["turns"] = team.tracer.turn
+        write_summary(summary, os.path.join(directory, "summary.json"))
+        with open(os.path.join(directory, "plan.md"), 'w', encoding='utf-8') as file:
+            file.write(summary["plan"] + "\n")
+        if tracing_enabled():
+            team.tracer.export(directory)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    write_json(os.path.join(directory, "result.json"), result)
+    print(f"{name}: {'failed, ' + result['error'] if result['error'] else 'done'} in {result['seconds']:.1f}s")
+    return result
+
+
+async def run_profiles(jobs, team_name, task, concurrency, share, out_dir, full):
+    from client_pool import pools
+    from run_team import Clients
+
+    # All profiles of this process share one rate-limited client per model.
+    clients = Clients(share=share)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(profile, name, run_id):
+        async with semaphore:
+            return await run_profile(profile, name, team_name, task, clients, out_dir, run_id, full)
+
+    results = await asyncio.gather(*(run(*job) for job in jobs))
+    return {"profiles": results, "pools": [pool.stats() for pool in pools]}
+
+
+def run_group(jobs, team_name, task, concurrency, share, out_dir, full):
+    """Entry point of a worker process: runs its share of the profiles concurrently."""
+    return asyncio.run(run_profiles(jobs, team_name, task, concurrency, share, out_dir, full))
+
+
+def summarize(results, pools, seconds, processes, concurrency):
+    done = [result for result in results if not result["error"]]
+    usages = [result["usage"] for result in done]
+    times = sorted(result["seconds"] for result in done)
+    return {"profiles": len(results), "succeeded": len(done), "failed": len(results) - len(done),
+            "processes": processes, "concurrency": concurrency, "seconds": seconds,
+            "plans_per_minute": len(done) / seconds * 60 if seconds else 0.0,
+            "run_p50_s": statistics.median(times) if times else None,
+            "run_p95_s": times[min(len(times) - 1, int(len(times) * 0.95))] if times else None,
+            "complete": sum(1 for result in done if result["complete"]),
+            "tokens": sum(usage["tokens"] for usage in usages),
+            "cost": sum(usage["cost"] for usage in usages),
+            "model_calls": sum(pool["calls"] for pool in pools),
+            "model_retries": sum(pool["retries"] for pool in pools),
+            "rate_limited": sum(pool["rate_limited"] for pool in pools)}
+
+
+def run_batch(profiles, team_name=DEFAULT_TEAM, task=None, processes=None, concurrency=CONCURRENCY,
+              out_dir=OUT_DIR, full=False):
+    """Runs the team for every profile directory, spread over `processes`
+    worker processes with up to `concurrency` profiles in flight in each.
+    The model limits in teams.py are split evenly between the processes.
+    Writes per-profile outputs and summary.json to `out_dir`; returns the summary."""
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    jobs = [(profile, name, f"{stamp}-{name}") for profile, name in zip(profiles, profile_names(profiles))]
+    processes = max(1, min(processes or os.cpu_count() or 1, len(jobs)))
+    groups = [jobs[i::processes] for i in range(processes)]
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    results, pools = [], []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(run_group, group, team_name, task, concurrency, 1 / processes, out_dir, full)
+                   for group in groups]
+        for future in futures:
+            done = future.result()
+            results += done["profiles"]
+            pools += done["pools"]
+    summary = summarize(results, pools, time.perf_counter() - start, processes, concurrency)
+    write_json(os.path.join(out_dir, "summary.json"), {**summary, "results": results})
+
+    print(f"batch: {summary['succeeded']}/{summary['profiles']} plans in {summary['seconds']:.1f}s "
+          f"({summary['plans_per_minute']:.1f} plans/min, {processes} processes x {concurrency}), "
+          f"run p50 {summary['run_p50_s'] or 0:.1f}s p95 {summary['run_p95_s'] or 0:.1f}s, "
+          f"{summary['model_calls']} model calls, {summary['model_retries']} retries, "
+          f"{summary['complete']} complete, {summary['tokens']} tokens, ${summary['cost']:.4f}")
+    for result in results:
+        if result["error"]:
+            print(f"  {result['name']}: {result['error']}")
+        elif not result["complete"]:
+            print(f"  {result['name']}: incomplete, stopped by {result['stopped_by']}")
+    print(f"outputs in {out_dir}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a team for many profiles, each a journal tree like this one")
+    parser.add_argument("profiles", nargs="*", help="profile directories (containing combine_files/files)")
+    parser.add_argument("--profiles-file", help="file listing profile directories, one per line")
+    parser.add_argument("--team", default=DEFAULT_TEAM, choices=list(TEAMS))
+    parser.add_argument("--task", default=None, help=f"task for every profile without a {TASK_FILE}")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="profiles in flight per process")
+    parser.add_argument("--out", default=None, help=f"output directory (default {OUT_DIR}/<timestamp>)")
+    parser.add_argument("--full", action="store_true", help="rebuild the combined journals from scratch")
+    args = parser.parse_args()
+
+    profiles = list(args.profiles)
+    if args.profiles_file:
+        with open(args.profiles_file, encoding='utf-8') as file:
+            profiles += [line.strip() for line in file if line.strip() and not line.startswith("#")]
+    missing = [profile for profile in profiles if not os.path.isdir(profile)]
+    if missing:
+        parser.error(f"not a directory: {', '.join(missing)}")
+    if not profiles:
+        parser.error("no profiles given")
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    out_dir = args.out or os.path.join(OUT_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    run_batch(profiles, args.team, args.task, args.processes, args.concurrency, out_dir, args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILE_NAME = re.compile(r"'([\w.-]+\.(?:txt|md))'")
+AGENT_LINE = re.compile(r'^\s*-\s*(\w+(?:Analyst))\s*:', re.M)
+
+PLAN = """# DAILY HEALTH PLAN
+
+## Summary of Key Insights
+- Coffee and chocolate raise discomfort ratings; oats lower them.
+
+## Daily Schedule
+- Morning Routine: 07:00 water, 07:30 oats with banana.
+
+# HEALTH ANALYSIS & RECOMMENDATIONS
+
+## Morning Routine
+07:00 water, 07:30 oats with banana.
+
+## Monitoring Plan
+Track the discomfort rating after each meal.
+
+APPROVE"""
+
+
+CACHE_BLOCK = 512
+CACHE_MIN = 4096
+
+
+class MockConfig:
+    """Latency and injected faults: `error_rate` of requests get a 429 asking
+    for a `retry_after` seconds wait, `spike_rate` take `spike_latency` longer,
+    and every request for one of `down_models` gets a 503. Prompt prefixes are
+    cached per model the way providers do, in CACHE_BLOCK characters from
+    CACHE_MIN on, and reported as `prompt_tokens_details.cached_tokens`."""
+
+    def __init__(self, latency=0.05, jitter=0.0, seed=0, error_rate=0.0, retry_after=0.1, spike_rate=0.0,
+                 spike_latency=1.0, down_models=()):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.spike_rate = spike_rate
+        self.spike_latency = spike_latency
+        self.down_models = set(down_models)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.spikes = 0
+        self.prefixes = {}
+
+    def cached_chars(self, model, prompt):
+        """Characters at the start of `prompt` seen before in a prompt to `model`; caches its prefixes."""
+        digest = hashlib.sha1()
+        cached = 0
+        with self.lock:
+            seen = self.prefixes.setdefault(model, set())
+            for end in range(CACHE_BLOCK, len(prompt) + 1, CACHE_BLOCK):
+                digest.update(prompt[end - CACHE_BLOCK:end].encode('utf-8'))
+                key = digest.hexdigest()
+                if key in seen and cached == end - CACHE_BLOCK:
+                    cached = end
+                seen.add(key)
+        return cached if cached >= CACHE_MIN else 0
+
+    def delay(self):
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            if self.spike_rate and self.rng.random() < self.spike_rate:
+                self.spikes += 1
+                delay += self.spike_latency
+            return delay
+
+    def fail(self):
+        with self.lock:
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.errors += 1
+                return True
+            return False
+
+
+def text_of(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def respond(body):
+    """Canned behaviour of the agents in teams.py.
+
+    Agents with tools call the first tool once with the file named in their
+    system prompt (unless it is in delta mode) and then answer; the
+    coordinator assigns every analyst named in its system prompt and then
+    returns a plan ending in APPROVE; anything
+    else (the LLM speaker selector) gets the coordinator's name.
+    """
+    messages = body.get("messages", [])
+    system = "\n".join(text_of(m) for m in messages if m.get("role") in ("system", "developer"))
+    tools = body.get("tools") or []
+    replied = any(m.get("role") == "assistant" for m in messages)
+
+    # In delta mode the new entries are in the prompt; a compliant analyst answers without reading.
+    if tools and messages and messages[-1].get("role") != "tool" and not replied and "DELTA MODE" not in system:
+        tool = tools[0]["function"]["name"]
+        files = FILE_NAME.findall(system)
+        args = {"filename": files[0] if files else "journal-app.txt"}
+        if tool != "File_Tool":
+            args = {}
+        return None, [{"id": "call_" + uuid.uuid4().hex[:8], "type": "function",
+                       "function": {"name": tool, "arguments": json.dumps(args)}}]
+    if "When assigning tasks" in system:
+        analysts = AGENT_LINE.findall(system)
+        if not any(m.get("role") == "assistant" for m in messages) and analysts:
+            return "\n".join(f"{i}. {name} : analyze your data source" for i, name in enumerate(analysts, 1)), None
+        return PLAN, None
+    if tools or messages and messages[-1].get("role") == "tool":
+        return "- Key Patterns: coffee raises ratings\n- Recommendations: eat oats", None
+    return "MainCoordinator", None
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, payload, headers=()):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in headers:
+                self.send_header(key, value)
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up, e.g. the losing copy of a hedged call.
+                pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            if body.get("model") in config.down_models:
+                self.send_json(503, {"error": {"message": "model unavailable (injected)", "type": "server_error"}})
+                return
+            if config.fail():
+                self.send_json(429, {"error": {"message": "rate limited (injected)", "type": "rate_limit_error"}},
+                               headers=[("Retry-After", str(config.retry_after))])
+                return
+            time.sleep(config.delay())
+            content, tool_calls = respond(body)
+            # Tool definitions come before the messages, as in the prompts providers cache.
+            prompt = json.dumps(body.get("tools") or []) + "".join(text_of(m) for m in body.get("messages", []))
+            prompt_chars = len(prompt)
+            cached_chars = config.cached_chars(body.get("model"), prompt)
+            completion_chars = len(content or json.dumps(tool_calls))
+            message = {"role": "assistant", "content": content}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            self.send_json(200, {
+                "id": "chatcmpl-" + uuid.uuid4().hex,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "message": message,
+                             "finish_reason": "tool_calls" if tool_calls else "stop"}],
+                "usage": {"prompt_tokens": prompt_chars // 4 + 1, "completion_tokens": completion_chars // 4 + 1,
+                          "total_tokens": (prompt_chars + completion_chars) // 4 + 2,
+                          "prompt_tokens_details": {"cached_tokens": cached_chars // 4}},
+            })
+
+    return Handler
+
+
+class MockServer:
+    """OpenAI-compatible chat completions endpoint on localhost, served from a thread."""
+
+    def __init__(self, latency=0.05, jitter=0.0, port=0, seed=0, **faults):
+        self.config = MockConfig(latency, jitter, seed, **faults)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), make_handler(self.config))
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible endpoint for offline runs")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--spike-rate", type=float, default=0.0, help="fraction of requests with a latency spike")
+    parser.add_argument("--spike-latency", type=float, default=1.0, help="seconds added by a latency spike")
+    parser.add_argument("--down-model", action="append", default=[], help="answer every request for this model "
+                        "with a 503 (repeatable)")
+    args = parser.parse_args()
+    with MockServer(args.latency, args.jitter, args.port, error_rate=args.error_rate, retry_after=args.retry_after,
+                    spike_rate=args.spike_rate, spike_latency=args.spike_latency,
+                    down_models=args.down_model) as server:
+        print(f"serving on {server.base_url}, set MODEL_BASE_URL to use it (Ctrl-C to stop)")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from benchmarks.mock_server import MockServer
+from benchmarks.synthetic import SPAN_HELP, generate, parse_span
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextmanager
+def working_dir(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {"p50": statistics.median(samples), "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            "min": samples[0], "max": samples[-1], "n": len(samples)}
+
+
+def tree_bytes(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+
+def bench_combine(root):
+    from combine_engine import SOURCES, combine, refresh
+
+    results = {}
+    with working_dir(root):
+        for name, spec in SOURCES.items():
+            source = spec.directory
+            files = len(os.listdir(source))
+            size = tree_bytes(source)
+            runs = {}
+            for mode, full in (("cold", True), ("noop", False)):
+                start = time.perf_counter()
+                combine(spec, full=full)
+                runs[mode] = time.perf_counter() - start
+            # One more day appended, as after a normal day of journaling.
+            newest = sorted(os.listdir(source))[-1]
+            shutil.copy(os.path.join(source, newest), os.path.join(source, "01-01-2099" + os.path.splitext(newest)[1]))
+            start = time.perf_counter()
+            combine(spec)
+            runs["append"] = time.perf_counter() - start
+            results[name] = {"files": files, "bytes": size, "seconds": runs,
+                             "cold_files_per_s": files / runs["cold"], "cold_mb_per_s": size / runs["cold"] / 1e6}
+        # Stats and search index as the combine scripts leave them.
+        start = time.perf_counter()
+        derived = refresh()
+        results["derived_seconds"] = time.perf_counter() - start
+        # Prompt tokens of each journal before and after normalization.
+        results["normalize"] = {name: {key: result["normalize"][key]
+                                       for key in ("tokens_before", "tokens_after", "ratio")}
+                                for name, result in derived.items() if result.get("normalize")}
+    return results
+
+
+def bench_file_tool(root, repeat):
+    from journal_index import read_window
+
+    path = os.path.join(root, "combine_files", "combine", "journal-app.txt")
+    cases = {"whole_capped": {}, "last_30": {"limit": 30}, "unbounded": {"max_bytes": 0},
+             "date_range_90d": {"start_date": "2024-10-01", "end_date": "2024-12-31"}}
+    results = {}
+    for name, kwargs in cases.items():
+        samples = []
+        size = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            size = len(read_window(path, **kwargs)["content"])
+            samples.append(time.perf_counter() - start)
+        results[name] = {"bytes": size, **percentiles(samples)}
+    return results
+
+
+async def run_team(name, cassette=None):
+    from autogen_agentchat.messages import BaseChatMessage
+    from run_team import build_team
+
+    team = build_team(name, cassette=cassette)
+    start = time.perf_counter()
+    result = await team.group_chat.run(task=team.spec["task"])
+    if cassette is not None:
+        cassette.start(name, team.spec["task"], team.data_dir)
+        cassette.save()
+    return {"seconds": time.perf_counter() - start, "messages": len(result.messages),
+            "turns": sum(1 for message in result.messages
+                         if isinstance(message, BaseChatMessage) and message.source != "user"),
+            "stop_reason": result.stop_reason}
+
+
+def bench_teams(root, latency, teams):
+    """Each team against the mock server, recorded to a cassette and then replayed from it
+    without latency: the replay time is the pipeline's own overhead."""
+    from cassette import Cassette
+
+    results = {}
+    with MockServer(latency=latency) as server, working_dir(root):
+        os.environ.update(MODEL_BASE_URL=server.base_url, OPENAI_API_KEY="mock", GEMINI_API_KEY="mock",
+                          LLM_CACHE="0", TRACE="0")
+        for name in teams:
+            before = server.config.requests
+            path = os.path.join(root, f"{name}.cassette.jsonl.gz")
+            results[name] = asyncio.run(run_team(name, Cassette(path, "record")))
+            results[name]["model_requests"] = server.config.requests - before
+            before = server.config.requests
+            replay = asyncio.run(run_team(name, Cassette(path, "replay")))
+            results[name]["replay_seconds"] = replay["seconds"]
+            results[name]["replay_model_requests"] = server.config.requests - before
+    return results
+
+
+async def pool_calls(client, workers, calls):
+    from autogen_core.models import UserMessage
+
+    samples = []
+    failed = 0
+
+    async def worker(w):
+        nonlocal failed
+        for i in range(calls):
+            start = time.perf_counter()
+            try:
+                await client.create([UserMessage(content=f"request {w}.{i}", source="user")])
+            except Exception:
+                failed += 1
+                continue
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(workers)))
+    return {"seconds": time.perf_counter() - start, "succeeded": len(samples), "failed": failed,
+            **(percentiles(samples) if samples else {})}
+
+
+def bench_pool(latency, workers=8, calls=25, error_rate=0.1, spike_rate=0.05):
+    """`workers` agents making `calls` calls each against a mock that rate limits
+    `error_rate` of them and slows down `spike_rate`, through a bare client and
+    through client_pool with and without hedging."""
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+    from client_pool import PooledClient
+
+    results = {"workers": workers, "calls": workers * calls, "error_rate": error_rate, "spike_rate": spike_rate}
+    for name, limits in (("bare", None), ("pooled", {"hedge_percentile": 0}),
+                         ("pooled_hedged", {"hedge_percentile": 90})):
+        with MockServer(latency=latency, jitter=latency, seed=1, error_rate=error_rate, retry_after=latency,
+                        spike_rate=spike_rate, spike_latency=latency * 20) as server:
+            client = OpenAIChatCompletionClient(model="o3-mini", api_key="mock", base_url=server.base_url,
+                                                max_retries=0)
+            if limits is not None:
+                client = PooledClient(client, "o3-mini", concurrency=16, rpm=60000, seed=1, **limits)
+            results[name] = asyncio.run(pool_calls(client, workers, calls))
+            results[name]["model_requests"] = server.config.requests + server.config.errors
+            if limits is not None:
+                results[name]["pool"] = client.stats()
+    return results
+
+
+def bench_startup(root, teams, repeat=5):
+    """Wall time of `run_team.py --team X --dry-run` in a fresh interpreter, as a user starting a run pays it."""
+    results = {}
+    with working_dir(root):
+        for name in teams:
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, os.path.join(REPO, "run_team.py"), "--team", name, "--dry-run"],
+                               capture_output=True, check=False)
+                samples.append(time.perf_counter() - start)
+            results[name] = percentiles(samples)
+    return results
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the combine scripts, FileTool and teams")
+    parser.add_argument("--span", default="1y", help=f"journal length in {SPAN_HELP}")
+    parser.add_argument("--repeat", type=int, default=50, help="FileTool reads per case")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock model latency in seconds")
+    parser.add_argument("--teams", default="health-plan,triggers-routine",
+                        help="comma separated teams from teams.py, empty to skip")
+    parser.add_argument("--skip-pool", action="store_true", help="skip the model client pool benchmark")
+    parser.add_argument("--out", default=None, help="JSON results file (default .bench/<version>-<span>.json)")
+    args = parser.parse_args()
+
+    try:
+        days = parse_span(args.span)
+    except ValueError as e:
+        parser.error(str(e))
+
+    sys.path.insert(0, REPO)
+    root = tempfile.mkdtemp(prefix="journal-bench-")
+    try:
+        counts = generate(root, days)
+        results = {
+            "version": git_version(), "python": platform.python_version(), "span_days": days,
+            "files": counts, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "combine": bench_combine(root),
+            "file_tool": bench_file_tool(root, args.repeat),
+        }
+        teams = [team for team in args.teams.split(",") if team]
+        if teams:
+            results["startup"] = bench_startup(root, teams)
+            results["teams"] = bench_teams(root, args.latency, teams)
+            results["teams_latency"] = args.latency
+        if not args.skip_pool:
+            results["pool"] = bench_pool(args.latency)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    out = args.out or os.path.join(REPO, ".bench", f"{results['version'] or 'unknown'}-{days}d.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
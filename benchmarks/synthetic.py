@@ -0,0 +1,108 @@
+import argparse
+import os
+import random
+import re
+from datetime import date, timedelta
+
+FOODS = ["oats", "banana", "rice", "chicken", "bread", "cheese", "coffee", "eggs", "yogurt", "salmon",
+         "broccoli", "apple", "pasta", "beans", "tea", "chocolate", "potatoes", "spinach"]
+SUPPLEMENTS = ["magnesium 200mg", "vitamin d", "omega 3", "zinc", "probiotic", "b12"]
+MEDS = ["ibuprofen", "antacid", "omeprazole"]
+EXERCISE = ["walk 30 min", "yoga", "run 5 km", "stretching", "cycling"]
+MOODS = ["tired", "fine", "anxious", "rested", "stressed", "good"]
+SPANS = {"1m": 30, "3m": 91, "6m": 182, "1y": 365, "2y": 730, "5y": 1826, "10y": 3652}
+SPAN = re.compile(r"(\d+)([dmy]?)")
+SPAN_HELP = f"days, or N followed by d, m or y (such as {', '.join(SPANS)})"
+
+
+def parse_span(span):
+    """Days in `span`: a number of days, or N days, months or years such as 90d, 2m or 1y."""
+    match = SPAN.fullmatch(span.strip().lower())
+    if not match or not int(match[1]):
+        raise ValueError(f"invalid span {span!r}: expected {SPAN_HELP}")
+    count, unit = int(match[1]), match[2]
+    # Average month and year lengths; the SPANS values are the same rounded down.
+    return {"": count, "d": count, "m": int(count * 365.25 / 12), "y": int(count * 365.25)}[unit]
+
+
+def app_entry(rng):
+    foods = rng.sample(FOODS, rng.randint(2, 5))
+    rating = 2 + ("coffee" in foods) + ("chocolate" in foods) - ("oats" in foods)
+    rating = max(1, min(4, rating + rng.choice([-1, 0, 0, 1])))
+    lines = [f"{rng.randint(6, 9):02d}:{rng.randint(0, 59):02d} Breakfast: {', '.join(foods[:2])}",
+             f"{rng.randint(12, 14):02d}:{rng.randint(0, 59):02d} Lunch: {', '.join(foods[2:]) or 'rice'}",
+             f"Supplements: {'; '.join(rng.sample(SUPPLEMENTS, rng.randint(1, 3)))}"]
+    if rng.random() < 0.2:
+        lines.append(f"Meds: {rng.choice(MEDS)}")
+    if rng.random() < 0.6:
+        lines.append(f"Exercise: {rng.choice(EXERCISE)}")
+    lines.append(f"Rating: {rating}")
+    lines.append(f"Notes: felt {rng.choice(MOODS)} in the afternoon.")
+    return "\n".join(lines) + "\n"
+
+
+def past_entry(rng):
+    sentences = [f"Woke up {rng.choice(MOODS)}.",
+                 f"Had {rng.choice(FOODS)} and {rng.choice(FOODS)} for dinner.",
+                 f"Stomach discomfort was {rng.choice(['mild', 'moderate', 'bad', 'absent'])} today.",
+                 f"Tried {rng.choice(SUPPLEMENTS)} again.",
+                 f"Work was {rng.choice(['busy', 'calm', 'stressful'])}."]
+    rng.shuffle(sentences)
+    return " ".join(sentences * rng.randint(1, 3)) + "\n"
+
+
+def thought_entry(rng):
+    return (f"I think {rng.choice(FOODS)} makes things worse when I am {rng.choice(MOODS)}. "
+            f"I want to keep {rng.choice(EXERCISE)} in my routine.\n")
+
+
+def generate(root, days, seed=0, end=date(2025, 1, 1), app_share=0.5):
+    """Write a synthetic journal tree of `days` days under `root`.
+
+    The older part (1 - app_share) goes to journal-past as markdown days named
+    like rename_md.py leaves them, the recent part to journal-app, and one
+    thought every few days to thought. Returns the file counts.
+    """
+    rng = random.Random(seed)
+    app_dir = os.path.join(root, "combine_files", "files", "journal-app")
+    past_dir = os.path.join(root, "combine_files", "files", "journal-past")
+    thought_dir = os.path.join(root, "combine_files", "files", "thought")
+    for directory in (app_dir, past_dir, thought_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    start = end - timedelta(days=days)
+    split = start + timedelta(days=int(days * (1 - app_share)))
+    counts = {"journal-app": 0, "journal-past": 0, "thought": 0}
+    for i in range(days):
+        day = start + timedelta(days=i)
+        name = day.strftime("%d-%m-%Y")
+        if day >= split:
+            with open(os.path.join(app_dir, name + ".txt"), 'w', encoding='utf-8') as file:
+                file.write(app_entry(rng))
+            counts["journal-app"] += 1
+        else:
+            with open(os.path.join(past_dir, name + ".md"), 'w', encoding='utf-8') as file:
+                file.write(past_entry(rng))
+            counts["journal-past"] += 1
+        if rng.random() < 0.3:
+            with open(os.path.join(thought_dir, name + ".txt"), 'w', encoding='utf-8') as file:
+                file.write(thought_entry(rng))
+            counts["thought"] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic journal tree")
+    parser.add_argument("root")
+    parser.add_argument("--span", default="1y", help=f"journal length in {SPAN_HELP}")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        days = parse_span(args.span)
+    except ValueError as e:
+        parser.error(str(e))
+    print(generate(args.root, days, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import json
+import os
+import re
+import time
+from typing import Sequence
+
+from autogen_agentchat.base import TerminatedException, TerminationCondition
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage, StopMessage
+
+from client_wrapper import ClientWrapper
+from teams import MODELS
+
+# Limits of one run, 0 for none. They are checked after every turn.
+MAX_TURNS = int(os.getenv("MAX_TURNS", "30"))
+MAX_TOKENS = int(os.getenv("MAX_TOKENS", "0"))
+MAX_SECONDS = float(os.getenv("MAX_SECONDS", "0"))
+MAX_COST = float(os.getenv("MAX_COST", "0"))
+SUMMARY_DIR = os.getenv("SUMMARY_DIR", ".runs")
+
+
+class Usage:
+    """Turns, model tokens, cost (USD, from the prices in teams.MODELS) and
+    wall time of one run, and the limits they are held to."""
+
+    def __init__(self, max_turns=MAX_TURNS, max_tokens=MAX_TOKENS, max_seconds=MAX_SECONDS, max_cost=MAX_COST):
+        self.limits = {"turns": max_turns, "tokens": max_tokens, "seconds": max_seconds, "cost": max_cost}
+        self.started = time.monotonic()
+        self.turns = 0
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    def add(self, model, result):
+        self.calls += 1
+        if result.cached:
+            # Answered from the response cache: no tokens were paid for.
+            return
+        prompt_price, completion_price = MODELS[model].get("price", (0.0, 0.0))
+        self.prompt_tokens += result.usage.prompt_tokens
+        self.completion_tokens += result.usage.completion_tokens
+        self.cost += (result.usage.prompt_tokens * prompt_price + result.usage.completion_tokens * completion_price) / 1e6
+
+    def current(self):
+        return {"turns": self.turns, "tokens": self.prompt_tokens + self.completion_tokens,
+                "seconds": time.monotonic() - self.started, "cost": self.cost}
+
+    def exceeded(self):
+        """The first limit reached, or None."""
+        current = self.current()
+        for name, limit in self.limits.items():
+            if limit and current[name] >= limit:
+                return name
+        return None
+
+    def as_dict(self):
+        return {**self.current(), "calls": self.calls, "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens}
+
+
+class MeteredClient(ClientWrapper):
+    """Adds the usage of every model call to a run's Usage."""
+
+    def __init__(self, client, model, usage):
+        super().__init__(client)
+        self.model = model
+        self.usage = usage
+
+    async def create(self, messages, **kwargs):
+        result = await self.client.create(messages, **kwargs)
+        self.usage.add(self.model, result)
+        return result
+
+    def create_stream(self, messages, **kwargs):
+        async def stream():
+            async for item in self.client.create_stream(messages, **kwargs):
+                if not isinstance(item, str):
+                    self.usage.add(self.model, item)
+                yield item
+        return stream()
+
+
+def metered(client, model, usage):
+    return MeteredClient(client, model, usage)
+
+
+def budget_stop(usage):
+    """The stop reason when a limit of `usage` is reached, else None."""
+    limit = usage.exceeded()
+    if limit is None:
+        return None
+    return f"Budget exceeded: {limit} ({usage.current()[limit]:.4g} of {usage.limits[limit]:.4g})"
+
+
+class BudgetTermination(TerminationCondition):
+    """Stops the group chat once any limit of `usage` is reached, counting turns as they pass."""
+
+    def __init__(self, usage):
+        self.usage = usage
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    async def __call__(self, messages: Sequence[BaseAgentEvent | BaseChatMessage]) -> StopMessage | None:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+        self.usage.turns += sum(1 for message in messages
+                                if isinstance(message, BaseChatMessage) and message.source != "user")
+        reason = budget_stop(self.usage)
+        if reason is None:
+            return None
+        self._terminated = True
+        return StopMessage(content=reason, source="BudgetTermination")
+
+    async def reset(self) -> None:
+        self._terminated = False
+
+
+def heading(title):
+    return re.compile(r'^\s*#{1,6}\s*[*_]*\s*' + re.escape(title) + r'\s*[*_]*\s*:?\s*$', re.I | re.M)
+
+
+def missing_sections(text, sections):
+    return [title for title in sections if not heading(title).search(text)]
+
+
+class PlanComplete(TerminationCondition):
+    """Stops the group chat when the coordinator says `stop_text` in a message that
+    has every required section heading; an early or incomplete APPROVE does not stop it."""
+
+    def __init__(self, coordinator, sections, stop_text="APPROVE"):
+        self.coordinator = coordinator
+        self.sections = list(sections)
+        self.stop_text = stop_text
+        self.rejected = 0
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    async def __call__(self, messages: Sequence[BaseAgentEvent | BaseChatMessage]) -> StopMessage | None:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+        for message in messages:
+            if not isinstance(message, BaseChatMessage) or message.source != self.coordinator:
+                continue
+            text = message.to_text()
+            if self.stop_text not in text:
+                continue
+            if missing_sections(text, self.sections):
+                self.rejected += 1
+                continue
+            self._terminated = True
+            return StopMessage(content=f"Plan complete ('{self.stop_text}' with all required sections)",
+                               source="PlanComplete")
+        return None
+
+    async def reset(self) -> None:
+        self._terminated = False
+
+
+def run_summary(run_id, team, coordinator, sections, usage, messages, stop_reason, stop_text="APPROVE"):
+    """Machine-readable outcome of a run: whether the plan is complete, what stopped it, the
+    usage against its limits, and the partial results (latest plan and analyst answers)."""
+    latest = {}
+    for message in messages:
+        if isinstance(message, BaseChatMessage) and message.source != "user":
+            latest[message.source] = message.to_text()
+    plan = latest.pop(coordinator, "")
+    missing = missing_sections(plan, sections)
+    complete = stop_text in plan and not missing
+    stop_reason = stop_reason or ""
+    if stop_reason.startswith("Budget exceeded"):
+        stopped_by = "budget:" + stop_reason.split(":", 1)[1].split()[0]
+    elif stop_reason:
+        stopped_by = "complete" if stop_reason.startswith("Plan complete") else stop_reason
+    else:
+        stopped_by = "complete" if complete else "incomplete"
+    return {"run_id": run_id, "team": team, "complete": complete, "stopped_by": stopped_by,
+            "stop_reason": stop_reason, "missing_sections": missing, "usage": usage.as_dict(),
+            "limits": usage.limits, "plan": plan, "analyses": latest}
+
+
+def write_summary(summary, path=None):
+    path = path or os.path.join(SUMMARY_DIR, f"{summary['run_id']}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(summary, file, indent=2)
+    return path
+
+
+def print_summary(summary, path):
+    usage = summary["usage"]
+    state = "complete" if summary["complete"] else f"partial, stopped by {summary['stopped_by']}"
+    missing = f", missing {', '.join(summary['missing_sections'])}" if summary["missing_sections"] else ""
+    print(f"run summary: {state}{missing}; {usage['turns']} turns, {usage['tokens']} tokens, "
+          f"${usage['cost']:.4f}, {usage['seconds']:.1f}s -> {path}")
@@ -0,0 +1,238 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from autogen_core.models import CreateResult, ModelInfo, RequestUsage
+
+from client_wrapper import ClientWrapper
+
+
+def cassette_from_env():
+    """A Cassette for CASSETTE_RECORD or CASSETTE_REPLAY (a file path), or None."""
+    if os.getenv("CASSETTE_REPLAY"):
+        return Cassette(os.environ["CASSETTE_REPLAY"], "replay", latency=float(os.getenv("CASSETTE_LATENCY", "0")),
+                        replay_tools=os.getenv("CASSETTE_TOOLS", "live").lower() == "replay")
+    if os.getenv("CASSETTE_RECORD"):
+        return Cassette(os.environ["CASSETTE_RECORD"], "record")
+    return None
+
+
+def request_key(messages, kwargs):
+    tools = [getattr(tool, "name", None) or tool.get("name") for tool in kwargs.get("tools") or ()]
+    data = json.dumps([[message.model_dump(mode="json") for message in messages], tools,
+                       str(kwargs.get("json_output")), dict(kwargs.get("extra_create_args") or {})],
+                      sort_keys=True, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def tool_key(name, args):
+    return hashlib.sha1(json.dumps([name, dict(args)], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class CassetteMiss(RuntimeError):
+    pass
+
+
+class Cassette:
+    """Every model response and tool result of a run, in a gzipped JSON lines file.
+
+    Recording keeps each model call's agent, model, request hash, latency and
+    result, and each tool call's arguments and result, in call order; `save`
+    writes them. Replaying serves the model results from memory, the one with
+    the same request hash first and otherwise the agent's next one in order,
+    sleeping `latency` times the recorded latency. Tools run for real and their
+    results are compared with the recording, or with `replay_tools` are served
+    from it too.
+    """
+
+    def __init__(self, path, mode, latency=0.0, replay_tools=False):
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.replay_tools = replay_tools
+        self.meta = {}
+        self.records = []
+        self.models = {}
+        self.counts = {"model_calls": 0, "exact": 0, "drifted": 0, "tool_calls": 0, "tool_mismatches": 0}
+        if mode == "replay":
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                for line in file:
+                    record = json.loads(line)
+                    if record["type"] == "meta":
+                        self.meta = record
+                    elif record["type"] == "model_info":
+                        self.models[record["model"]] = record["info"]
+                    else:
+                        self.records.append(record)
+            self.used = [False] * len(self.records)
+
+    def start(self, team, task, data_dir):
+        if self.mode == "record":
+            self.meta = {"type": "meta", "team": team, "task": task, "data_dir": data_dir,
+                         "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    def take(self, kind, owner, key):
+        """The first unused `kind` record of `owner` with `key`, else its first unused one."""
+        fallback = None
+        for i, record in enumerate(self.records):
+            if self.used[i] or record["type"] != kind or record["owner"] != owner:
+                continue
+            if record["key"] == key:
+                self.used[i] = True
+                return record, True
+            if fallback is None:
+                fallback = i
+        if fallback is None:
+            raise CassetteMiss(f"{self.path} has no {kind} result left for {owner}")
+        self.used[fallback] = True
+        return self.records[fallback], False
+
+    def client(self, client, model, agent):
+        """`client` (the real one, None when replaying) for `agent`'s calls to `model`."""
+        if self.mode == "replay":
+            return ReplayClient(self, model, agent)
+        if model not in self.models:
+            self.models[model] = dict(client.model_info)
+        return RecordingClient(client, self, model, agent)
+
+    def tool(self, tool):
+        """Records or replays every call of `tool` through its run_json."""
+        run_json = tool.run_json
+
+        async def recorded_run_json(args, *rest, **kwargs):
+            key = tool_key(tool.name, args)
+            if self.mode == "replay":
+                self.counts["tool_calls"] += 1
+                record, _ = self.take("tool", tool.name, key)
+                if self.replay_tools:
+                    await self.sleep(record["latency"])
+                    return record["result"]
+                result = await run_json(args, *rest, **kwargs)
+                if tool.return_value_as_string(result) != record["result"]:
+                    self.counts["tool_mismatches"] += 1
+                return result
+            start = time.perf_counter()
+            result = await run_json(args, *rest, **kwargs)
+            self.records.append({"type": "tool", "owner": tool.name, "key": key, "args": dict(args),
+                                 "latency": time.perf_counter() - start,
+                                 "result": tool.return_value_as_string(result)})
+            return result
+        tool.run_json = recorded_run_json
+        return tool
+
+    async def sleep(self, seconds):
+        if self.latency and seconds:
+            await asyncio.sleep(seconds * self.latency)
+
+    def save(self):
+        if self.mode != "record":
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + f".{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as file:
+            file.write(json.dumps(self.meta) + "\n")
+            for model, info in self.models.items():
+                file.write(json.dumps({"type": "model_info", "model": model, "info": info}) + "\n")
+            for record in self.records:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def print_stats(self):
+        counts = self.counts
+        if self.mode == "record":
+            models = sum(1 for record in self.records if record["type"] == "model")
+            print(f"cassette: recorded {models} model calls and {len(self.records) - models} tool calls "
+                  f"to {self.path} ({os.path.getsize(self.path) / 1024:.1f} KB)")
+            return
+        tools = "served from the cassette" if self.replay_tools else f"{counts['tool_mismatches']} results differ"
+        left = self.used.count(False)
+        print(f"cassette: replayed {counts['model_calls']} model calls from {self.path} ({counts['exact']} exact, "
+              f"{counts['drifted']} with a changed prompt), {counts['tool_calls']} tool calls ({tools})"
+              f"{f', {left} recorded calls unused' if left else ''}, latency x{self.latency:g}")
+
+
+class RecordingClient(ClientWrapper):
+    def __init__(self, client, cassette, model, agent):
+        super().__init__(client)
+        self.cassette = cassette
+        self.model = model
+        self.agent = agent
+
+    def record(self, messages, kwargs, start, result):
+        self.cassette.records.append({"type": "model", "owner": self.agent, "model": self.model,
+                                      "key": request_key(messages, kwargs), "latency": time.perf_counter() - start,
+                                      "result": result.model_dump(mode="json")})
+
+    async def create(self, messages, **kwargs):
+        start = time.perf_counter()
+        result = await self.client.create(messages, **kwargs)
+        self.record(messages, kwargs, start, result)
+        return result
+
+    def create_stream(self, messages, **kwargs):
+        async def stream():
+            start = time.perf_counter()
+            async for item in self.client.create_stream(messages, **kwargs):
+                if isinstance(item, CreateResult):
+                    self.record(messages, kwargs, start, item)
+                yield item
+        return stream()
+
+
+class ReplayClient(ClientWrapper):
+    """Answers `agent`'s calls from a cassette, without a model client or network."""
+
+    def __init__(self, cassette, model, agent):
+        super().__init__(None)
+        self.cassette = cassette
+        self.model = model
+        self.agent = agent
+        self.usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    async def create(self, messages, **kwargs):
+        record, exact = self.cassette.take("model", self.agent, request_key(messages, kwargs))
+        self.cassette.counts["model_calls"] += 1
+        self.cassette.counts["exact" if exact else "drifted"] += 1
+        await self.cassette.sleep(record["latency"])
+        result = CreateResult.model_validate(record["result"])
+        self.usage = RequestUsage(prompt_tokens=self.usage.prompt_tokens + result.usage.prompt_tokens,
+                                  completion_tokens=self.usage.completion_tokens + result.usage.completion_tokens)
+        return result
+
+    def create_stream(self, messages, **kwargs):
+        async def stream():
+            yield await self.create(messages, **kwargs)
+        return stream()
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self.usage
+
+    def total_usage(self) -> RequestUsage:
+        return self.usage
+
+    def count_tokens(self, messages, *, tools=()) -> int:
+        return sum(len(str(message.content)) for message in messages) // 4 + 1
+
+    def remaining_tokens(self, messages, *, tools=()) -> int:
+        return 128_000 - self.count_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):  # type: ignore
+        return self.model_info
+
+    @property
+    def model_info(self) -> ModelInfo:
+        # A model the recording never called (e.g. routed differently) borrows another one's info.
+        info = self.cassette.models.get(self.model) or next(iter(self.cassette.models.values()), None)
+        if info is None:
+            raise CassetteMiss(f"{self.cassette.path} recorded no model calls, so it has no model info for "
+                               f"{self.agent} ({self.model})")
+        return info
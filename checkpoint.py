@@ -0,0 +1,180 @@
+import json
+import os
+import time
+
+from autogen_agentchat.messages import (
+    BaseChatMessage,
+    MessageFactory,
+    ModelClientStreamingChunkEvent,
+    SelectSpeakerEvent,
+    ThoughtEvent,
+    ToolCallExecutionEvent,
+    ToolCallRequestEvent,
+    ToolCallSummaryMessage,
+)
+from autogen_core.models import AssistantMessage, FunctionExecutionResultMessage
+
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", ".checkpoints")
+
+
+def checkpoint_enabled():
+    return os.getenv("CHECKPOINT", "1").lower() not in ("0", "false", "no", "off")
+
+
+def checkpoint_path(run_id, directory=CHECKPOINT_DIR):
+    return os.path.join(directory, f"{run_id}.jsonl")
+
+
+class Checkpoint:
+    """Append-only record of a group chat run, one JSON object per line.
+
+    The first line names the team, task and journal directory. Every message and event of the
+    run follows as it is streamed (completed turns, tool calls and their
+    results), with the selector's decisions in between. Lines are flushed and
+    synced as they are written, so whatever was on disk when a run died can
+    be resumed with `load` and `team_state`. The file is only created with the
+    first completed turn; until then there is nothing to resume.
+    """
+
+    def __init__(self, run_id, directory=CHECKPOINT_DIR):
+        self.run_id = run_id
+        self.directory = directory
+        self.path = checkpoint_path(run_id, directory)
+        self.file = None
+        self.pending = []
+        self.turn = 0
+
+    def write(self, record):
+        if self.file is None:
+            self.pending.append(record)
+            return
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def persist(self):
+        """Opens the file and writes the records held back until now."""
+        if self.file is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        pending, self.pending = self.pending, []
+        for record in pending:
+            self.write(record)
+
+    def start(self, team, task, data_dir):
+        self.write({"type": "run", "run_id": self.run_id, "team": team, "task": task, "data_dir": data_dir,
+                    "at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+    def resume(self, turns):
+        self.turn = turns
+        self.persist()
+        self.write({"type": "resume", "turn": turns, "at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+    async def observe(self, stream):
+        """Pass a run_stream through, writing each message and event of the group chat thread."""
+        async for message in stream:
+            if not isinstance(message, (ModelClientStreamingChunkEvent, SelectSpeakerEvent)) \
+                    and hasattr(message, "dump"):
+                self.write({"type": "message", "turn": self.turn, "message": message.dump()})
+                if isinstance(message, BaseChatMessage) and message.source != "user":
+                    self.turn += 1
+                    self.persist()
+            yield message
+
+    def selector(self, selector_func):
+        if selector_func is None:
+            return None
+
+        def select(messages):
+            speaker = selector_func(messages)
+            self.write({"type": "speaker", "turn": self.turn, "speaker": speaker or "llm"})
+            return speaker
+        return select
+
+    def end(self, stop_reason):
+        self.write({"type": "end", "turn": self.turn, "stop_reason": stop_reason})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def completed(messages):
+    """`messages` up to the last finished turn; events of a turn cut short are dropped."""
+    end = len(messages)
+    while end and not isinstance(messages[end - 1], BaseChatMessage):
+        end -= 1
+    return messages[:end]
+
+
+def turns(messages):
+    """The agent turns completed in `messages`, task messages excluded."""
+    return [message for message in messages if isinstance(message, BaseChatMessage) and message.source != "user"]
+
+
+def load(run_id, directory=CHECKPOINT_DIR):
+    """The run record and the messages of the completed turns of checkpoint `run_id`."""
+    factory = MessageFactory()
+    run, ended, messages = None, None, []
+    with open(checkpoint_path(run_id, directory), encoding='utf-8') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of a run killed while writing it.
+                continue
+            if record["type"] == "run" and run is None:
+                run = record
+            elif record["type"] == "resume":
+                messages = completed(messages)
+                ended = None
+            elif record["type"] == "end":
+                ended = record
+            elif record["type"] == "message":
+                messages.append(factory.create(record["message"]))
+    if run is None:
+        raise ValueError(f"{checkpoint_path(run_id, directory)} has no run record")
+    return run, completed(messages), ended
+
+
+def agent_state(name, messages):
+    """The ChatAgentContainer state of participant `name` after `messages`, as the runtime builds it:
+    every chat message is buffered by the other participants, and an agent moves its buffer into its
+    model context when its turn starts, followed by its own model calls and tool results."""
+    context, buffer = [], []
+    speaking = False
+    thought = None
+    for message in messages:
+        if message.source == name and not speaking:
+            context.extend(buffered.to_model_message() for buffered in buffer)
+            buffer = []
+            speaking = True
+        if message.source == name:
+            if isinstance(message, ThoughtEvent):
+                thought = message.content
+            elif isinstance(message, ToolCallRequestEvent):
+                context.append(AssistantMessage(content=message.content, source=name, thought=thought))
+                thought = None
+            elif isinstance(message, ToolCallExecutionEvent):
+                context.append(FunctionExecutionResultMessage(content=message.content))
+            elif isinstance(message, BaseChatMessage) and not isinstance(message, ToolCallSummaryMessage):
+                context.append(AssistantMessage(content=message.to_model_text(), source=name, thought=thought))
+                thought = None
+        if isinstance(message, BaseChatMessage):
+            speaking = False
+            if message.source != name:
+                buffer.append(message)
+    return {"type": "ChatAgentContainerState",
+            "agent_state": {"type": "AssistantAgentState",
+                            "llm_context": {"messages": [message.model_dump() for message in context]}},
+            "message_buffer": [message.dump() for message in buffer]}
+
+
+def team_state(messages, participants, manager):
+    """A SelectorGroupChat TeamState that continues after `messages`, for `group_chat.load_state`."""
+    done = turns(messages)
+    states = {name: agent_state(name, messages) for name in participants}
+    states[manager] = {"type": "SelectorManagerState", "message_thread": [message.dump() for message in messages],
+                       "current_turn": len(done), "previous_speaker": done[-1].source if done else None}
+    return {"type": "TeamState", "agent_states": states}
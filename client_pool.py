@@ -0,0 +1,213 @@
+import asyncio
+import email.utils
+import os
+import random
+import statistics
+import time
+from collections import deque
+
+from client_wrapper import ClientWrapper
+
+MAX_RETRIES = int(os.getenv("MODEL_MAX_RETRIES", "5"))
+BASE_DELAY = float(os.getenv("MODEL_RETRY_DELAY", "0.5"))
+MAX_DELAY = float(os.getenv("MODEL_RETRY_MAX_DELAY", "30"))
+TIMEOUT = float(os.getenv("MODEL_TIMEOUT", "120"))
+# Send a second copy of a call still running after this percentile of recent latencies (0 = never).
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0"))
+HEDGE_MIN_SAMPLES = 10
+LATENCY_WINDOW = 200
+RETRY_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+# Every pooled client created, for the end of run report.
+pools = []
+
+
+class TokenBucket:
+    """`rate` requests per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        self.refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self):
+        async with self.lock:
+            while not self.try_acquire():
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait, from Retry-After(-ms) headers, or None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def retryable(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUS
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, openai.APIConnectionError)
+
+
+class PooledClient(ClientWrapper):
+    """Shares one model's rate limits between every agent using it.
+
+    Calls wait for a token of the per-model bucket (`rpm` requests per minute)
+    and a slot of the per-model semaphore (`concurrency`). Rate limits, server
+    errors and timeouts (`timeout` seconds per attempt) are retried up to
+    `max_retries` times, after the server's Retry-After when given and
+    otherwise after a full-jitter exponential backoff. With `hedge_percentile`
+    set, a call still running after that percentile of recent latencies gets a
+    second copy when a slot and a token are free; the first answer wins.
+    """
+
+    def __init__(self, client, model, concurrency=8, rpm=600, burst=None, max_retries=MAX_RETRIES,
+                 timeout=TIMEOUT, hedge_percentile=HEDGE_PERCENTILE, seed=None):
+        super().__init__(client)
+        self.model = model
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rpm / 60, burst or concurrency)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.rng = random.Random(seed)
+        self.counts = {"calls": 0, "attempts": 0, "retries": 0, "rate_limited": 0, "timeouts": 0, "errors": 0,
+                       "hedges": 0, "hedge_wins": 0}
+        self.waited = 0.0
+        pools.append(self)
+
+    def backoff(self, attempt, error):
+        delay = retry_after(error)
+        if delay is None:
+            delay = self.rng.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+        return min(delay, MAX_DELAY)
+
+    def hedge_after(self):
+        if not self.hedge_percentile or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))]
+
+    async def attempt(self, messages, kwargs):
+        start = time.perf_counter()
+        result = await asyncio.wait_for(self.client.create(messages, **kwargs), self.timeout)
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+    async def hedged(self, messages, kwargs):
+        primary = asyncio.ensure_future(self.attempt(messages, kwargs))
+        threshold = self.hedge_after()
+        if threshold is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done or self.semaphore.locked() or not self.bucket.try_acquire():
+            return await primary
+        self.counts["hedges"] += 1
+        async with self.semaphore:
+            hedge = asyncio.ensure_future(self.attempt(messages, kwargs))
+            pending = {primary, hedge}
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is hedge:
+                                self.counts["hedge_wins"] += 1
+                            return task.result()
+                # Both failed: report the primary's error.
+                return primary.result()
+            finally:
+                for task in pending:
+                    task.cancel()
+
+    async def create(self, messages, **kwargs):
+        self.counts["calls"] += 1
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            await self.bucket.acquire()
+            async with self.semaphore:
+                self.waited += time.perf_counter() - start
+                self.counts["attempts"] += 1
+                try:
+                    return await self.hedged(messages, kwargs)
+                except Exception as e:
+                    error = e
+            if isinstance(error, asyncio.TimeoutError):
+                self.counts["timeouts"] += 1
+            elif getattr(error, "status_code", None) == 429:
+                self.counts["rate_limited"] += 1
+            else:
+                self.counts["errors"] += 1
+            if attempt >= self.max_retries or not retryable(error):
+                raise error
+            delay = self.backoff(attempt, error)
+            attempt += 1
+            self.counts["retries"] += 1
+            await asyncio.sleep(delay)
+
+    def create_stream(self, messages, **kwargs):
+        # Streams go straight through, limited but not retried: a retry would replay chunks already yielded.
+        async def stream():
+            await self.bucket.acquire()
+            async with self.semaphore:
+                self.counts["calls"] += 1
+                self.counts["attempts"] += 1
+                async for item in self.client.create_stream(messages, **kwargs):
+                    yield item
+        return stream()
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {"model": self.model, **self.counts, "waited_s": self.waited,
+                "p50_s": statistics.median(latencies) if latencies else None,
+                "p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None}
+
+
+def pooled(client, model, **limits):
+    return PooledClient(client, model, **limits)
+
+
+def print_stats():
+    for pool in pools:
+        stats = pool.stats()
+        if not stats["calls"]:
+            continue
+        latency = f"p50 {stats['p50_s']:.2f}s p95 {stats['p95_s']:.2f}s" if stats["p50_s"] is not None else "-"
+        print(f"client pool {stats['model']}: {stats['calls']} calls, {stats['retries']} retries "
+              f"({stats['rate_limited']} rate limited, {stats['timeouts']} timeouts, {stats['errors']} errors), "
+              f"{stats['hedges']} hedges ({stats['hedge_wins']} won), {stats['waited_s']:.2f}s queued, {latency}")
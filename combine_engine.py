@@ -0,0 +1,428 @@
+import argparse
+import codecs
+import copy
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from journal_index import index_path, write_index
+
+MANIFEST_VERSION = 2
+
+CHUNK = 1 << 20
+# Day files up to this size are read ahead by the thread pool; larger ones are streamed.
+PREFETCH_MAX = 1 << 20
+PREFETCH_WINDOW = 256
+WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+DAY_FILE = r'(?P<day>\d{2})-(?P<month>\d{2})-(?P<year>\d{4})'
+
+
+class SourceSpec:
+    """Where a journal's day files live and how they are combined.
+
+    `pattern` must have named groups day, month and year. Each day is written
+    as `header` formatted with the date (`date_format`), then the file content,
+    then `separator`; days are ordered by date, oldest first unless `order`
+    is "desc".
+    """
+
+    def __init__(self, name, directory, output, pattern, date_format, header="=={}==\n\n", separator="\n\n",
+                 order="asc"):
+        self.name = name
+        self.directory = directory
+        self.output = output
+        self.pattern = re.compile(pattern)
+        self.date_format = date_format
+        self.header = header
+        self.separator = separator.encode('utf-8')
+        self.order = order
+
+    def header_for(self, day):
+        return self.header.format(day.strftime(self.date_format)).encode('utf-8')
+
+    def layout(self):
+        # Anything that changes the bytes of a block invalidates the manifest.
+        return [self.date_format, self.header, self.separator.decode('utf-8'), self.order]
+
+    def under(self, root):
+        """This source in the journal tree at `root` instead of the working directory."""
+        spec = copy.copy(self)
+        spec.directory = os.path.join(root, self.directory)
+        spec.output = os.path.join(root, self.output)
+        return spec
+
+
+SOURCES = {
+    "journal-past": SourceSpec("journal-past", "combine_files/files/journal-past",
+                               "combine_files/combine/journal-past.md", DAY_FILE + r'\.md', "%B %d %Y"),
+    "journal-app": SourceSpec("journal-app", "combine_files/files/journal-app",
+                              "combine_files/combine/journal-app.txt", DAY_FILE, "%B %d, %Y"),
+    "thought": SourceSpec("thought", "combine_files/files/thought",
+                          "combine_files/combine/thought.txt", DAY_FILE, "%B %d, %Y"),
+}
+
+
+class NormalizedReader:
+    """File reader yielding what the old text-mode read produced: universal
+    newlines, and an error if the file is not valid utf-8. Hashes what it yields."""
+
+    def __init__(self, file):
+        self.file = file
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.digest = hashlib.sha1()
+        self.pending_cr = False
+        self.size = 0
+
+    def read(self, size=-1):
+        while True:
+            chunk = self.file.read(size)
+            if not chunk:
+                self.decoder.decode(b"", final=True)
+                return b""
+            self.decoder.decode(chunk)
+            if self.pending_cr and chunk.startswith(b"\n"):
+                chunk = chunk[1:]
+            self.pending_cr = chunk.endswith(b"\r")
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            if chunk:
+                self.digest.update(chunk)
+                self.size += len(chunk)
+                return chunk
+
+
+def read_day(path):
+    with open(path, 'rb') as infile:
+        reader = NormalizedReader(infile)
+        content = b"".join(iter(lambda: reader.read(CHUNK), b""))
+    return content, reader.digest.hexdigest()
+
+
+def hash_day(path):
+    with open(path, 'rb') as infile:
+        reader = NormalizedReader(infile)
+        while reader.read(CHUNK):
+            pass
+    return reader.digest.hexdigest()
+
+
+def prefetch(path, size):
+    return read_day(path) if size <= PREFETCH_MAX else None
+
+
+def scan(spec):
+    """(date, file name, mtime_ns, size) for every day file of `spec`, in output order."""
+    files = []
+    with os.scandir(spec.directory) as entries:
+        for entry in entries:
+            match = spec.pattern.match(entry.name)
+            if not match or not entry.is_file():
+                continue
+            try:
+                day = date(int(match["year"]), int(match["month"]), int(match["day"]))
+            except ValueError as e:
+                print(f"Skipping {entry.name}: {e}")
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                # Deleted or renamed since the listing.
+                continue
+            files.append((day, entry.name, st.st_mtime_ns, st.st_size))
+    files.sort(reverse=spec.order == "desc")
+    return files
+
+
+def manifest_path(output):
+    return output + ".manifest.json"
+
+
+def load_manifest(path):
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable manifest {path}: {e}")
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + f".{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+    os.replace(tmp_path, path)
+
+
+def copy_range(infile, outfile, offset, length):
+    infile.seek(offset)
+    while length > 0:
+        chunk = infile.read(min(CHUNK, length))
+        if not chunk:
+            raise IOError(f"{infile.name} is shorter than its manifest")
+        outfile.write(chunk)
+        length -= len(chunk)
+
+
+class Writer:
+    """Writes planned day blocks into `outfile`, fresh days read ahead by a thread pool.
+
+    Entries with a "copy_from" range are copied from the previous output
+    (adjacent ranges in one go); all others are written from their day file.
+    """
+
+    def __init__(self, spec, pool):
+        self.spec = spec
+        self.pool = pool
+        self.files_written = 0
+        self.bytes_written = 0
+        self.skipped = {}
+
+    def write(self, entries, dates, outfile, offset, old_output=None):
+        pending = deque()
+        fresh = iter([entry for entry in entries if "copy_from" not in entry])
+
+        def refill():
+            while len(pending) < PREFETCH_WINDOW:
+                entry = next(fresh, None)
+                if entry is None:
+                    return
+                path = os.path.join(self.spec.directory, entry["file"])
+                pending.append((entry, self.pool.submit(prefetch, path, entry["size"])))
+
+        refill()
+        kept = []
+        run = None
+        for entry in entries:
+            if "copy_from" in entry:
+                start, length = entry.pop("copy_from")
+                if run and run[0] + run[1] == start:
+                    run[1] += length
+                else:
+                    if run:
+                        copy_range(old_output, outfile, *run)
+                    run = [start, length]
+                entry.update(offset=offset, length=length)
+                offset += length
+                kept.append(entry)
+                continue
+            if run:
+                copy_range(old_output, outfile, *run)
+                run = None
+
+            _, future = pending.popleft()
+            refill()
+            length = self.write_day(entry, dates[entry["file"]], future, outfile)
+            if length is None:
+                continue
+            entry.update(offset=offset, length=length)
+            offset += length
+            kept.append(entry)
+        if run:
+            copy_range(old_output, outfile, *run)
+        return kept, offset
+
+    def write_day(self, entry, day, future, outfile):
+        path = os.path.join(self.spec.directory, entry["file"])
+        start = outfile.tell()
+        try:
+            prefetched = future.result()
+            header = self.spec.header_for(day)
+            outfile.write(header)
+            if prefetched is not None:
+                content, entry["sha1"] = prefetched
+                outfile.write(content)
+                size = len(content)
+            else:
+                with open(path, 'rb') as infile:
+                    reader = NormalizedReader(infile)
+                    shutil.copyfileobj(reader, outfile, CHUNK)
+                entry["sha1"] = reader.digest.hexdigest()
+                size = reader.size
+            outfile.write(self.spec.separator)
+        except Exception as e:
+            print(f"Error reading {entry['file']}: {e}")
+            self.skipped[entry["file"]] = [entry["mtime_ns"], entry["size"]]
+            outfile.seek(start)
+            outfile.truncate()
+            return None
+        length = len(header) + size + len(self.spec.separator)
+        self.files_written += 1
+        self.bytes_written += length
+        return length
+
+
+def combine(spec, full=False):
+    """Bring `spec.output` up to date with the day files in `spec.directory`.
+
+    A manifest next to the output remembers mtime, size, sha1 and the byte
+    range of every day block, and the stat of unreadable files so they are not
+    retried until they change. Files whose stat is unchanged are not opened;
+    stat-changed files are hashed to tell touched from edited. New days at the
+    end are appended in place, any other change rewrites the output by copying
+    unchanged blocks from the previous one, and nothing is written when nothing
+    changed. Day files are read ahead by a thread pool and streamed through
+    large buffered writes, so memory stays flat however many days there are.
+    The day byte ranges are also written as the sidecar header index that
+    `journal_index` reads from.
+    """
+    start = time.perf_counter()
+    if not os.path.isdir(spec.directory):
+        print(f"Dir not found: {spec.directory}")
+        return None
+    output_dir = os.path.dirname(spec.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    files = scan(spec)
+    path = manifest_path(spec.output)
+    manifest = None if full else load_manifest(path)
+    if manifest is not None and (manifest.get("layout") != spec.layout() or not os.path.isfile(spec.output)
+                                 or os.path.getsize(spec.output) != manifest.get("size")):
+        manifest = None
+    old = {entry["file"]: entry for entry in manifest["entries"]} if manifest else {}
+    old_skipped = manifest.get("skipped", {}) if manifest else {}
+    skipped = {}
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        entries = []
+        to_hash = []
+        for day, file_name, mtime_ns, size in files:
+            if old_skipped.get(file_name) == [mtime_ns, size]:
+                skipped[file_name] = old_skipped[file_name]
+                continue
+            entry = {"file": file_name, "date": day.isoformat(), "mtime_ns": mtime_ns, "size": size}
+            prev = old.get(file_name)
+            if prev is not None and prev["mtime_ns"] == mtime_ns and prev["size"] == size:
+                entry.update(sha1=prev["sha1"], copy_from=(prev["offset"], prev["length"]))
+            elif prev is not None:
+                to_hash.append((entry, prev))
+            entries.append(entry)
+
+        paths = [os.path.join(spec.directory, entry["file"]) for entry, _ in to_hash]
+        for (entry, prev), digest in zip(to_hash, pool.map(safe_hash, paths)):
+            if digest is not None and digest == prev["sha1"]:
+                entry.update(sha1=digest, copy_from=(prev["offset"], prev["length"]))
+
+        dates = {file_name: day for day, file_name, _, _ in files}
+        changed = sum(1 for entry in entries if "copy_from" not in entry)
+        old_order = [entry["file"] for entry in manifest["entries"]] if manifest else []
+        new_order = [entry["file"] for entry in entries]
+        writer = Writer(spec, pool)
+
+        if manifest is None:
+            mode = "cold"
+            entries, size = write_new(spec, writer, entries, dates, None)
+        elif not changed and new_order == old_order:
+            mode = "noop"
+            entries = [strip_copy(entry) for entry in entries]
+            size = manifest["size"]
+        elif all("copy_from" in entry for entry in entries[:len(old_order)]) \
+                and new_order[:len(old_order)] == old_order:
+            mode = "append"
+            head = [strip_copy(entry) for entry in entries[:len(old_order)]]
+            with open(spec.output, 'r+b', buffering=CHUNK) as outfile:
+                outfile.seek(manifest["size"])
+                tail, size = writer.write(entries[len(old_order):], dates, outfile, manifest["size"])
+                outfile.truncate()
+            entries = head + tail
+        else:
+            mode = "patch"
+            entries, size = write_new(spec, writer, entries, dates, spec.output)
+
+    skipped.update(writer.skipped)
+    if mode != "noop" or entries != manifest["entries"] or skipped != old_skipped:
+        save_manifest(path, {"version": MANIFEST_VERSION, "layout": spec.layout(), "size": size,
+                             "entries": entries, "skipped": skipped})
+    if mode != "noop" or not os.path.isfile(index_path(spec.output)):
+        write_index(spec.output, [(entry["date"], entry["offset"], entry["length"]) for entry in entries])
+
+    elapsed = time.perf_counter() - start
+    result = {"source": spec.name, "mode": mode, "files": len(entries), "changed": writer.files_written,
+              "files_written": writer.files_written, "bytes_written": writer.bytes_written, "seconds": elapsed,
+              "files_per_s": writer.files_written / elapsed if elapsed else 0.0,
+              "mb_per_s": writer.bytes_written / elapsed / 1e6 if elapsed else 0.0}
+    print(f"combine {len(entries)} into {spec.output} [{mode}: {writer.files_written} new/changed, "
+          f"{writer.bytes_written / 1e6:.2f} MB written in {elapsed * 1000:.1f} ms, "
+          f"{result['files_per_s']:.0f} files/s, {result['mb_per_s']:.1f} MB/s]")
+    return result
+
+
+def safe_hash(path):
+    try:
+        return hash_day(path)
+    except Exception:
+        return None
+
+
+def strip_copy(entry):
+    start, length = entry.pop("copy_from")
+    entry.update(offset=start, length=length)
+    return entry
+
+
+def write_new(spec, writer, entries, dates, old_output):
+    tmp_output = spec.output + f".{os.getpid()}.tmp"
+    with open(tmp_output, 'wb', buffering=CHUNK) as outfile:
+        if old_output is None:
+            entries, size = writer.write(entries, dates, outfile, 0)
+        else:
+            with open(old_output, 'rb') as infile:
+                entries, size = writer.write(entries, dates, outfile, 0, infile)
+    os.replace(tmp_output, spec.output)
+    return entries, size
+
+
+def refresh(names=None, full=False, order=None, root=None):
+    """Combine the named sources (all by default) and update what is derived from them.
+    With `root`, the journal tree under that directory is used, e.g. one profile of a batch."""
+    import app_stats
+    import journal_normalize
+    import journal_search
+
+    results = {}
+    specs = {}
+    for name in names or list(SOURCES):
+        # A copy, so an order given here never sticks to SOURCES for later calls.
+        spec = specs[name] = copy.copy(SOURCES[name]) if root is None else SOURCES[name].under(root)
+        if order:
+            spec.order = order
+        result = combine(spec, full=full)
+        if result is None:
+            continue
+        results[name] = result
+        if name == "journal-app" and (result["mode"] != "noop" or not os.path.isfile(app_stats.store_path(spec.output))):
+            app_stats.extract(spec.output)
+        stale = result["mode"] != "noop" or not journal_normalize.fresh(spec.output)
+        if journal_normalize.normalize_enabled() and stale:
+            result["normalize"] = journal_normalize.update(spec.output)
+    directories = {os.path.dirname(specs[name].output) for name in results}
+    for directory in directories:
+        journal_search.update(directory)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combine the day files of each journal source")
+    parser.add_argument("sources", nargs="*", help=f"sources to combine: {', '.join(SOURCES)} (default all)")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rebuild from scratch")
+    parser.add_argument("--order", choices=("asc", "desc"), help="output day order (default asc)")
+    args = parser.parse_args()
+    unknown = [name for name in args.sources if name not in SOURCES]
+    if unknown:
+        parser.error(f"unknown source {', '.join(unknown)}")
+    refresh(args.sources, full=args.full, order=args.order)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import os
+import re
+from typing import List
+
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import (
+    AssistantMessage,
+    FunctionExecutionResult,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    UserMessage,
+)
+
+SELECTOR_TOKEN_BUDGET = int(os.getenv("SELECTOR_TOKEN_BUDGET", "4000"))
+COORDINATOR_TOKEN_BUDGET = int(os.getenv("COORDINATOR_TOKEN_BUDGET", "24000"))
+SUMMARY_CHARS = 600
+# Lines worth keeping from an analyst turn: the bullets and headings of its FORMAT section.
+STRUCTURED = re.compile(r'^\s*(?:[-*•]|#+|\d+[.)])\s*\S')
+
+# Every context created, for the end of run report.
+contexts = []
+
+
+def compaction_enabled():
+    return os.getenv("CONTEXT_COMPACTION", "1").lower() not in ("0", "false", "no", "off")
+
+
+def text_tokens(text):
+    # Same rough 4 characters per token as the mock server; only used for budgets and savings.
+    return len(text) // 4 + 1
+
+
+def message_tokens(message):
+    content = message.content
+    if isinstance(content, str):
+        return text_tokens(content)
+    if isinstance(content, list):
+        return sum(text_tokens(str(getattr(item, "content", None) or getattr(item, "arguments", None) or item))
+                   for item in content)
+    return 1
+
+
+def summarize_turn(source, text, limit=SUMMARY_CHARS):
+    """A short structured stand-in for a turn another agent finished."""
+    if text.startswith("path: "):
+        # Raw File_Tool output, the analyst's tool result passed on as its turn.
+        path = text[len("path: "):].split(",", 1)[0]
+        return f"[{source} read {path}: {len(text)} chars of journal content, elided]"
+    lines = [line.strip() for line in text.splitlines() if STRUCTURED.match(line)]
+    summary = "\n".join(lines) if lines else " ".join(text.split())
+    if len(summary) > limit:
+        summary = summary[:limit].rsplit(" ", 1)[0] + " ..."
+    return f"[summary of {source}'s earlier turn, {len(text)} chars]\n{summary}"
+
+
+def fit(lengths, available):
+    """Largest cap such that the lengths, each cut to the cap, add up to at most `available`."""
+    available = max(available, SUMMARY_CHARS * len(lengths))
+    remaining = len(lengths)
+    for length in sorted(lengths):
+        if length * remaining > available:
+            return available // remaining
+        available -= length
+        remaining -= 1
+    return max(lengths, default=0)
+
+
+def cut(text, cap):
+    if len(text) <= cap:
+        return text
+    half = cap // 2
+    return (text[:half] + f"\n[... {len(text) - 2 * half} chars cut to fit the context budget ...]\n"
+            + text[len(text) - half:])
+
+
+def tool_handle(result, call):
+    arguments = f"({call.arguments})" if call is not None else ""
+    return (f"[{result.name}{arguments} returned {len(result.content)} chars, elided from context; "
+            f"call it again if you need the content]")
+
+
+class CompactingContext(ChatCompletionContext):
+    """Model context that keeps what an agent or the selector sees bounded.
+
+    Messages the reader has already acted on are compacted when the context is
+    read: tool results become handles naming the call, and turns of other agents
+    become short structured summaries. If the view still exceeds `budget`
+    tokens, the oldest compacted messages are dropped, keeping the task and the
+    reader's own last turn, and then the middle is cut out of the largest turns
+    the reader has not acted on yet. For the selector, which has
+    no turns of its own, everything but the last `keep_recent` messages counts
+    as acted on. Turns of agents outside `listen_to` (when given) are always
+    summarized: an analyst only needs its assignment, not its peers' journal
+    reads. The full history stays in the context; only the view shrinks.
+    """
+
+    def __init__(self, name, budget=0, keep_recent=None, listen_to=None, initial_messages=None):
+        super().__init__(initial_messages)
+        self.name = name
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.listen_to = listen_to
+        self.reads = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.last_tokens = 0
+        contexts.append(self)
+
+    def fresh_from(self, messages):
+        """Index of the first message the reader has not acted on yet."""
+        if self.keep_recent is not None:
+            return max(0, len(messages) - self.keep_recent)
+        own = [isinstance(message, (AssistantMessage, FunctionExecutionResultMessage)) for message in messages]
+        end = len(messages)
+        if end and own[-1]:
+            # In the middle of its own tool round, which still needs what started it.
+            while end and own[end - 1]:
+                end -= 1
+            while end and not own[end - 1]:
+                end -= 1
+            return end
+        while end and not own[end - 1]:
+            end -= 1
+        return end
+
+    def compact(self, messages, fresh):
+        calls = {}
+        compacted = []
+        for i, message in enumerate(messages):
+            if isinstance(message, AssistantMessage) and isinstance(message.content, list):
+                calls.update((call.id, call) for call in message.content)
+            peer = isinstance(message, UserMessage) and self.listen_to is not None \
+                and message.source not in self.listen_to
+            if (i >= fresh and not peer) or i == 0:
+                compacted.append(message)
+            elif isinstance(message, FunctionExecutionResultMessage):
+                compacted.append(FunctionExecutionResultMessage(content=[
+                    FunctionExecutionResult(call_id=result.call_id, name=result.name, is_error=result.is_error,
+                                            content=tool_handle(result, calls.get(result.call_id)))
+                    for result in message.content]))
+            elif isinstance(message, UserMessage) and isinstance(message.content, str) \
+                    and message.source not in ("user", self.name):
+                compacted.append(UserMessage(content=summarize_turn(message.source, message.content),
+                                             source=message.source))
+            else:
+                compacted.append(message)
+        return compacted
+
+    def trim(self, messages, fresh):
+        """Drops the oldest acted-on messages until the view fits the budget,
+        keeping the reader's own last turn; if that is not enough, cuts the
+        middle out of the largest new turns of other agents."""
+        total = sum(message_tokens(message) for message in messages)
+        limit = fresh
+        while limit > 1 and isinstance(messages[limit - 1], (AssistantMessage, FunctionExecutionResultMessage)):
+            limit -= 1
+        start = 1
+        while total > self.budget and start < limit:
+            end = start + 1
+            # A tool call and its results go together.
+            while end < limit and isinstance(messages[end], FunctionExecutionResultMessage):
+                end += 1
+            total -= sum(message_tokens(message) for message in messages[start:end])
+            start = end
+        if start > 1:
+            marker = UserMessage(content=f"[{start - 1} earlier messages omitted to fit the context budget]",
+                                 source="context")
+            fresh += 2 - start
+            messages = messages[:1] + [marker] + messages[start:]
+        if total <= self.budget:
+            return messages
+
+        received = [i for i in range(max(fresh, 1), len(messages)) if isinstance(messages[i], UserMessage)
+                    and isinstance(messages[i].content, str) and messages[i].source not in ("user", self.name)]
+        fixed = total - sum(message_tokens(messages[i]) for i in received)
+        cap = fit([len(messages[i].content) for i in received], (self.budget - fixed) * 4)
+        messages = list(messages)
+        for i in received:
+            messages[i] = UserMessage(content=cut(messages[i].content, cap), source=messages[i].source)
+        return messages
+
+    async def get_messages(self) -> List[LLMMessage]:
+        messages = list(self._messages)
+        fresh = self.fresh_from(messages)
+        view = self.compact(messages, fresh)
+        if self.budget:
+            view = self.trim(view, fresh)
+        self.reads += 1
+        self.tokens_in += sum(message_tokens(message) for message in messages)
+        self.last_tokens = sum(message_tokens(message) for message in view)
+        self.tokens_out += self.last_tokens
+        return view
+
+    def stats(self):
+        return {"name": self.name, "reads": self.reads, "tokens_in": self.tokens_in, "tokens_out": self.tokens_out,
+                "saved": self.tokens_in - self.tokens_out, "budget": self.budget}
+
+
+def make_context(name, role, coordinator=None):
+    """The context for an agent ("coordinator" or "analyst") or the "selector", None when compaction is off."""
+    if not compaction_enabled():
+        return None
+    if role == "selector":
+        return CompactingContext(name, budget=SELECTOR_TOKEN_BUDGET, keep_recent=1)
+    if role == "coordinator":
+        return CompactingContext(name, budget=COORDINATOR_TOKEN_BUDGET)
+    return CompactingContext(name, listen_to={"user", coordinator})
+
+
+def print_stats():
+    used = [context.stats() for context in contexts if context.reads]
+    if not used:
+        return
+    before = sum(stats["tokens_in"] for stats in used)
+    saved = sum(stats["saved"] for stats in used)
+    print(f"context compaction: {saved} of {before} prompt tokens saved "
+          f"({saved / before * 100 if before else 0:.0f}%)")
+    for stats in used:
+        print(f"  {stats['name']:<26} {stats['reads']:>3} reads  {stats['tokens_in']:>8} -> {stats['tokens_out']:>8} "
+              f"tokens  budget {stats['budget'] or '-'}")
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+
+from autogen_agentchat.messages import TextMessage
+from autogen_agentchat.ui import Console
+
+from speaker_selector import parse_assignments
+
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "4"))
+
+
+def run_mode():
+    return os.getenv("RUN_MODE", "chat").lower()
+
+
+async def without_echo(stream, count):
+    # run_stream first yields the task messages back; the findings were already printed.
+    async for message in stream:
+        if count > 0:
+            count -= 1
+            continue
+        yield message
+
+
+def observed(stream, tracer):
+    return tracer.observe(stream) if tracer is not None else stream
+
+
+async def run_analyst(agent, task, semaphore, tracer=None):
+    async with semaphore:
+        start = time.perf_counter()
+        result = await Console(observed(agent.run_stream(task=task), tracer))
+        return agent.name, result, time.perf_counter() - start
+
+
+async def run_fanout(coordinator, analysts, task, max_concurrency=FANOUT_CONCURRENCY, max_rounds=3,
+                     stop_text="APPROVE", tracer=None, usage=None):
+    """Run the team with the coordinator's assignments dispatched concurrently.
+
+    The coordinator gets the task, every analyst it assigns in its reply runs at
+    the same time (at most `max_concurrency` at once), and their answers are
+    handed back to the coordinator in one message for synthesis. This repeats
+    while the coordinator keeps assigning work without saying `stop_text`.
+    Turns are counted on `tracer` when one is given. With a budgets.Usage, the
+    run also stops after the round in which one of its limits was reached.
+    Returns the coordinator's final message.
+    """
+    by_name = {agent.name: agent for agent in analysts}
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    result = await Console(observed(coordinator.run_stream(task=task), tracer))
+    reply = result.messages[-1]
+    if usage is not None:
+        usage.turns += 1
+
+    for _ in range(max_rounds):
+        text = reply.to_text()
+        assignments = parse_assignments(text, list(by_name))
+        if stop_text in text or not assignments or usage is not None and usage.exceeded():
+            break
+
+        start = time.perf_counter()
+        done = await asyncio.gather(*(run_analyst(by_name[name], assignment, semaphore, tracer)
+                                      for name, assignment in assignments))
+        elapsed = time.perf_counter() - start
+        latencies = ", ".join(f"{name} {seconds:.1f}s" for name, _, seconds in done)
+        print(f"fan-out: {len(done)} analysts in {elapsed:.1f}s "
+              f"(serial would be {sum(seconds for _, _, seconds in done):.1f}s: {latencies})")
+
+        findings = [TextMessage(content=analysis.messages[-1].to_text(), source=name)
+                    for name, analysis, _ in done]
+        stream = without_echo(coordinator.run_stream(task=findings), len(findings))
+        result = await Console(observed(stream, tracer))
+        reply = result.messages[-1]
+        if usage is not None:
+            usage.turns += len(done) + 1
+    return reply
@@ -0,0 +1,65 @@
+import os
+
+from autogen_core.tools import FunctionTool
+
+from journal_index import DEFAULT_MAX_BYTES, read_window
+from journal_normalize import fresh, normalize_enabled, with_context
+
+
+class FileTool(FunctionTool):
+    """Reads windows of the combined journals, from their normalized versions
+    (journal_normalize.py) when those are up to date. Results are memoized for the
+    life of the tool, keyed by path, mtime, size and window, so analysts asking
+    for the same file share one disk read until the file changes."""
+
+    def __init__(self, filepath: str):
+        description = ("Retrieves content from a file in a specific folder."
+                        "Given a file name, it returns the file path and its contents. "
+                        "Optionally pass start_date/end_date (YYYY-MM-DD) and limit to read only the "
+                        "matching (most recent) dated entries, and offset/max_bytes to page through long results.")
+        super().__init__(name="File_Tool", description=description, func=self.getinfo)
+        self.filepath = filepath
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def read(self, filename, start_date="", end_date="", limit=0, offset=0, max_bytes=DEFAULT_MAX_BYTES):
+        path = os.path.join(self.filepath, filename)
+        normalized = fresh(path) if normalize_enabled() else None
+        path = normalized or path
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size, start_date, end_date, limit, offset, max_bytes)
+        window = self.memo.get(key)
+        if window is not None:
+            self.hits += 1
+            self.bytes_saved += len(window["content"])
+            return window
+        self.misses += 1
+        window = read_window(path, start_date, end_date, limit, offset, max_bytes)
+        if normalized:
+            window["content"] = with_context(path, window["content"])
+        self.memo[key] = window
+        return window
+
+    def stats(self):
+        calls = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / calls if calls else 0.0,
+                "bytes_saved": self.bytes_saved}
+
+    def getinfo(self, filename: str, start_date: str = "", end_date: str = "", limit: int = 0,
+                offset: int = 0, max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+        path = os.path.join(self.filepath, filename)
+        if not os.path.isfile(path):
+            return f"error {path} not found"
+
+        try:
+            window = self.read(filename, start_date, end_date, limit, offset, max_bytes)
+        except Exception as e:
+            return f"Error reading {path}: {str(e)}"
+
+        content = window["content"]
+        if window["next_offset"] is not None:
+            content += (f"\n[truncated: {window['remaining']} more bytes, "
+                        f"call again with offset={window['next_offset']}]")
+        return f"path: {path}, content: {content}"
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import mmap
+import os
+import time
+from datetime import date, timedelta
+from typing import Sequence
+
+from autogen_agentchat.agents import BaseChatAgent
+from autogen_agentchat.base import Response
+from autogen_agentchat.messages import BaseChatMessage, TextMessage
+from autogen_core import CancellationToken
+
+from journal_index import load_index
+
+FINDINGS_FILE = "findings.json"
+# Days after which an analyst's findings are rebuilt from the whole history in delta mode.
+FULL_ANALYSIS_DAYS = float(os.getenv("FULL_ANALYSIS_DAYS", "7"))
+
+
+def analysis_mode():
+    """"off" (every run analyzes everything, nothing is stored), "delta" or "full"."""
+    return os.getenv("ANALYSIS_MODE", "off").lower()
+
+
+def dated_entries(path):
+    return [entry for entry in load_index(path) if entry[0]]
+
+
+def fingerprint(path, entries, through):
+    """Hash of the dates and text of the entries of `path` up to `through`, so an edited day
+    changes it even when its length does not."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for iso_date, offset, length in entries:
+            if iso_date <= through:
+                digest.update(f"{iso_date}:{length}:".encode('utf-8'))
+                digest.update(mm[offset:offset + length])
+    return digest.hexdigest()
+
+
+def file_state(path):
+    """What an analysis of `path` covers: for a dated journal the last entry date and a
+    fingerprint of the entries up to it, otherwise the file's size and mtime."""
+    if not os.path.isfile(path):
+        return None
+    entries = dated_entries(path)
+    if entries:
+        through = max(entry[0] for entry in entries)
+        return {"through": through, "fingerprint": fingerprint(path, entries, through)}
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class FindingsStore:
+    """Each analyst's latest findings for a team, with the journal state they
+    cover, kept in `data_dir`/findings.json next to the combined journals."""
+
+    def __init__(self, data_dir, team):
+        self.path = os.path.join(data_dir, FINDINGS_FILE)
+        self.team = team
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                self.data = json.load(file)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def get(self, analyst):
+        return self.data.get(self.team, {}).get(analyst)
+
+    def put(self, analyst, findings, files, full):
+        previous = self.get(analyst) or {}
+        now = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.data.setdefault(self.team, {})[analyst] = {
+            "findings": findings, "files": files, "analyzed_at": now,
+            "full_at": now if full else previous.get("full_at", now)}
+
+    def save(self):
+        tmp_path = self.path + f".{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.data, file, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def plan_analyst(record, paths, current, full=False):
+    """("full" | "delta" | "reuse", {file: date its new entries start after}) for one analyst
+    reading `paths` ({file: path}), whose journals are now in the `current` file states.
+
+    A full analysis runs on demand, without earlier findings, when they are
+    older than FULL_ANALYSIS_DAYS, or when something other than new days
+    changed (an edited day, a rewritten summary, another file); otherwise only
+    files with new days are sent, and with none the findings are reused.
+    """
+    if full or record is None or age_days(record["full_at"]) >= FULL_ANALYSIS_DAYS:
+        return "full", {}
+    new = {}
+    for file_name, state in current.items():
+        old = record["files"].get(file_name)
+        if state == old:
+            continue
+        if state is None or old is None or ("through" in state) != ("through" in old):
+            return "full", {}
+        if "through" not in state or state["through"] < old["through"] \
+                or fingerprint(paths[file_name], dated_entries(paths[file_name]), old["through"]) != old["fingerprint"]:
+            return "full", {}
+        new[file_name] = old["through"]
+    return ("delta" if new else "reuse"), new
+
+
+def age_days(timestamp):
+    return (time.time() - time.mktime(time.strptime(timestamp, "%Y-%m-%dT%H:%M:%S"))) / 86400
+
+
+def day_after(iso_date):
+    return (date.fromisoformat(iso_date) + timedelta(days=1)).isoformat()
+
+
+def delta_section(findings, new_entries):
+    """Appended to an analyst's system message in delta mode; `new_entries` maps a file
+    to (date analyzed through, window of the entries after it)."""
+    parts = ["DELTA MODE",
+             "You analyzed these journals before. Your previous findings below cover every entry up to the "
+             "dates given; only the entries after them are new. Do not read the older entries again. Update "
+             "your findings with the new entries and reply with the complete updated findings in your FORMAT.",
+             "PREVIOUS FINDINGS", findings.strip()]
+    for file_name, (through, window) in new_entries.items():
+        parts.append(f"NEW ENTRIES in {file_name} after {through} ({len(window['dates'])} days)")
+        parts.append(window["content"].rstrip())
+    return "\n\n" + "\n\n".join(parts) + "\n"
+
+
+class FindingsAgent(BaseChatAgent):
+    """Stands in for an analyst whose journals have no new entries since its
+    last analysis: it answers with the stored findings, without a model call."""
+
+    def __init__(self, name, description, findings, through):
+        super().__init__(name=name, description=description)
+        self.findings = findings
+        self.through = through
+
+    @property
+    def produced_message_types(self) -> Sequence[type[BaseChatMessage]]:
+        return (TextMessage,)
+
+    async def on_messages(self, messages: Sequence[BaseChatMessage], cancellation_token: CancellationToken) -> Response:
+        note = f"(No new entries since {self.through}; findings unchanged.)\n\n" if self.through else ""
+        return Response(chat_message=TextMessage(content=note + self.findings, source=self.name))
+
+    async def on_reset(self, cancellation_token: CancellationToken) -> None:
+        pass
+
+
+def last_answer(state):
+    """The agent's last plain text answer in a saved model context, or None."""
+    for message in reversed(state.get("messages", [])):
+        if message.get("type") == "AssistantMessage" and isinstance(message.get("content"), str):
+            return message["content"]
+    return None
+
+
+class DeltaStats:
+    def __init__(self):
+        self.modes = {}
+        self.new_days = 0
+
+    def print_stats(self):
+        if not self.modes:
+            return
+        counts = {mode: sum(1 for value in self.modes.values() if value == mode) for mode in ("full", "delta", "reuse")}
+        print(f"delta analysis: {counts['full']} full, {counts['delta']} delta ({self.new_days} new days), "
+              f"{counts['reuse']} reused without a model call")
@@ -0,0 +1,169 @@
+import json
+import mmap
+import os
+import re
+from datetime import datetime
+
+# Headers written by the combine scripts, e.g. "==March 05 2024==" or "==March 05, 2024==".
+HEADER = re.compile(rb'^==(.+?)==[ \t]*\r?$', re.M)
+DATE_FORMATS = ("%B %d %Y", "%B %d, %Y", "%Y-%m-%d", "%d-%m-%Y")
+
+DEFAULT_MAX_BYTES = 100_000
+
+
+def index_path(path):
+    return path + ".idx.json"
+
+
+def parse_date(text):
+    text = text.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def to_iso(text):
+    if not text:
+        return None
+    date = parse_date(text)
+    if date is None:
+        raise ValueError(f"unrecognised date {text!r}, use YYYY-MM-DD")
+    return date.isoformat()
+
+
+def write_index(path, entries):
+    """Write the sidecar index for `path`; `entries` are (iso_date, offset, length)."""
+    st = os.stat(path)
+    index = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+             "entries": [list(entry) for entry in entries]}
+    tmp_path = index_path(path) + f".{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(index, file)
+    os.replace(tmp_path, index_path(path))
+    return index
+
+
+def scan_index(path):
+    entries = []
+    size = os.path.getsize(path)
+    if size == 0:
+        return entries
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        starts = [(match.start(), match.group(1)) for match in HEADER.finditer(mm)]
+    for i, (offset, label) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else size
+        date = parse_date(label.decode('utf-8', errors='replace'))
+        entries.append((date.isoformat() if date else None, offset, end - offset))
+    return entries
+
+
+def load_index(path):
+    """Return the header index of `path`, rebuilding the sidecar if it is stale or missing."""
+    st = os.stat(path)
+    try:
+        with open(index_path(path), 'r', encoding='utf-8') as file:
+            index = json.load(file)
+        if index["size"] == st.st_size and index["mtime_ns"] == st.st_mtime_ns:
+            return index["entries"]
+    except (OSError, ValueError, KeyError):
+        pass
+    entries = scan_index(path)
+    try:
+        return write_index(path, entries)["entries"]
+    except OSError:
+        return [list(entry) for entry in entries]
+
+
+def select(entries, start_date=None, end_date=None, limit=0):
+    """Entries dated within [start_date, end_date]; with `limit`, only the most recent ones."""
+    if start_date or end_date:
+        entries = [entry for entry in entries if entry[0] is not None
+                   and (not start_date or entry[0] >= start_date)
+                   and (not end_date or entry[0] <= end_date)]
+    if limit and limit > 0:
+        entries = entries[-limit:]
+    return entries
+
+
+def char_length(byte):
+    """Bytes of the UTF-8 character starting with `byte`: 0xxxxxxx starts 1, 110xxxxx 2,
+    1110xxxx 3, 11110xxx 4; a continuation byte (10xxxxxx) counts as 1."""
+    return 1 if byte < 0xC0 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+
+
+def complete_length(data):
+    """Length of `data` without a UTF-8 character cut off at its end."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue
+        return len(data) if back >= char_length(byte) else len(data) - back
+    return len(data)
+
+
+def read_window(path, start_date=None, end_date=None, limit=0, offset=0, max_bytes=DEFAULT_MAX_BYTES):
+    """Read part of a combined journal without loading the whole file.
+
+    Without a date range or limit the window is taken over the whole file,
+    otherwise over the concatenation of the selected day entries. At most
+    `max_bytes` are returned starting `offset` bytes into that window, ending
+    on a whole UTF-8 character; the returned dict says how many bytes are left
+    and where to continue.
+    """
+    start_date = to_iso(start_date)
+    end_date = to_iso(end_date)
+
+    size = os.path.getsize(path)
+    if start_date or end_date or limit:
+        entries = load_index(path)
+        chosen = select(entries, start_date, end_date, limit)
+        ranges = [(entry[1], entry[2]) for entry in chosen]
+        dates = [entry[0] for entry in chosen]
+    else:
+        ranges = [(0, size)] if size else []
+        dates = []
+
+    total = sum(length for _, length in ranges)
+    offset = max(0, offset)
+    want = total - offset if not max_bytes or max_bytes <= 0 else min(max_bytes, total - offset)
+    # Up to 3 bytes more, to finish a character that is longer than the whole window.
+    cap, want = want, min(want + 3, total - offset)
+    parts = []
+    if want > 0:
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            skip = offset
+            for start, length in ranges:
+                if skip >= length:
+                    skip -= length
+                    continue
+                take = min(length - skip, want)
+                parts.append(mm[start + skip:start + skip + take])
+                want -= take
+                skip = 0
+                if want <= 0:
+                    break
+    data = b"".join(parts)
+    if offset + cap < total:
+        # The next window starts with the character this one would have cut in two; a window
+        # smaller than its first character gets that whole character, so paging still advances.
+        data = data[:complete_length(data[:cap]) or min(len(data), char_length(data[0]))]
+    end = offset + len(data)
+    return {"content": data.decode('utf-8', errors='ignore'), "dates": dates,
+            "offset": offset, "next_offset": end if end < total else None,
+            "remaining": max(0, total - end), "total": total}
+
+
+def iter_entries(path):
+    """(iso_date, body) for every dated entry of `path`, in file order, header stripped."""
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for iso_date, offset, length in load_index(path):
+            if iso_date is None:
+                continue
+            block = mm[offset:offset + length].decode('utf-8', errors='replace')
+            body = block.split("\n", 1)[1].strip() if "\n" in block else ""
+            yield iso_date, body
@@ -0,0 +1,271 @@
+import os
+import re
+import time
+from collections import Counter
+
+from journal_index import HEADER, load_index, parse_date
+
+# A value must recur this often across the days of a file, and be this long, to get a §n code.
+MIN_REPEATS = int(os.getenv("NORMALIZE_MIN_REPEATS", "3"))
+MIN_CODE_CHARS = 16
+NOTE = ("Normalized journal: §n stands for the text listed for it here, \"same as <date>\" repeats "
+        "that day's entry, and \"[xN]\" after a line means it was written N times in a row. "
+        "A leading \"\\\" is not part of the line.")
+
+LABELED = re.compile(r'^(\s*[^:§]{1,40}: )(.+)$')
+CODE_LINE = re.compile(r'^(\s*(?:[^:§]{1,40}: )?)§(\d+)$')
+CODE_DEF = re.compile(r'^§(\d+) = (.*)$')
+CODE = re.compile(r'§(\d+)')
+REPEAT = re.compile(r'^(.*) \[x(\d+)\]$')
+SAME_AS = re.compile(r'^same as (\d{4}-\d{2}-\d{2})$')
+# Whole lines with a time in them are free text; coding them saves little and hides them from the analysts.
+TIMESTAMP = re.compile(r'\b\d{1,2}:\d{2}\b')
+# Written before a line that would otherwise read as a code or a reference.
+ESCAPE = "\\"
+
+
+def normalize_enabled():
+    return os.getenv("NORMALIZE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def normalized_path(path):
+    root, ext = os.path.splitext(path)
+    return root + ".norm" + ext
+
+
+def fresh(path):
+    """The normalized version of `path` if there is one at least as new as it, else None."""
+    norm = normalized_path(path)
+    try:
+        return norm if os.stat(norm).st_mtime_ns >= os.stat(path).st_mtime_ns else None
+    except OSError:
+        return None
+
+
+def text_tokens(text):
+    # Same rough 4 characters per token as the rest of the reports.
+    return len(text) // 4 + 1
+
+
+def canonical(body):
+    """The lines of an entry with whitespace collapsed: no trailing spaces, single spaces
+    after the indentation, single blank lines, none at either end."""
+    lines = []
+    for line in body.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        indent = line[:len(line) - len(line.lstrip())]
+        lines.append(indent + re.sub(r'\s+', ' ', stripped))
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def dated_entries(path):
+    """(iso_date, canonical lines) of every entry of a combined journal, or None when it
+    has text that is not under a dated header."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    entries = load_index(path)
+    if not entries or data[:entries[0][1]].strip() or any(entry[0] is None for entry in entries):
+        return None
+    result = []
+    for iso_date, offset, length in entries:
+        block = data[offset:offset + length].decode('utf-8', errors='replace')
+        result.append((iso_date, canonical(block.split("\n", 1)[1] if "\n" in block else "")))
+    return result
+
+
+def value_of(line):
+    match = LABELED.match(line)
+    return (match.group(1), match.group(2)) if match else (line[:len(line) - len(line.lstrip())], line.strip())
+
+
+def codable(line):
+    """The value of `line` that may get a §n code, or None."""
+    prefix, value = value_of(line)
+    if not line or (not prefix.strip() and TIMESTAMP.search(value)):
+        return None
+    return value
+
+
+def escaped(line):
+    """`line` as written when it is not coded: escaped if it would read as a code or a reference."""
+    if line.startswith(ESCAPE) or CODE_LINE.match(line) or SAME_AS.match(line):
+        return ESCAPE + line
+    return line
+
+
+def normalize(entries, min_repeats=MIN_REPEATS):
+    """The normalized text of `entries`, and how many days became references and how many codes it uses.
+
+    A day identical to an earlier one becomes "same as <date>"; values (what
+    follows "Label: ", or a whole line without a time in it) recurring at least
+    `min_repeats` times and at least MIN_CODE_CHARS long get a §n code; then runs
+    of identical lines are written once with "[xN]". Headers are ISO dates.
+    Lines that already look like one of these are escaped, so they read back as written.
+    """
+    seen, bodies, references = {}, [], 0
+    for iso_date, lines in entries:
+        key = "\n".join(lines)
+        reference = f"same as {seen[key]}" if key in seen else None
+        if reference and len(reference) < len(key):
+            bodies.append((iso_date, None, reference))
+            references += 1
+            continue
+        seen.setdefault(key, iso_date)
+        bodies.append((iso_date, lines, None))
+
+    counts = Counter(codable(line) for _, lines, _ in bodies if lines for line in lines)
+    counts.pop(None, None)
+    ranked = sorted((value for value, count in counts.items()
+                     if count >= min_repeats and len(value) >= MIN_CODE_CHARS),
+                    key=lambda value: (-counts[value] * len(value), value))
+    codes = {value: i for i, value in enumerate(ranked, 1)}
+
+    parts = [NOTE] + [f"§{i} = {value}" for value, i in codes.items()]
+    out = ["\n".join(parts) + "\n"]
+    for iso_date, lines, reference in bodies:
+        if lines is None:
+            out.append(f"=={iso_date}==\n{reference}\n")
+            continue
+        encoded = []
+        for line in lines:
+            value = codable(line)
+            encoded.append(f"{value_of(line)[0]}§{codes[value]}" if value in codes else escaped(line))
+        collapsed = []
+        i = 0
+        while i < len(encoded):
+            j = i
+            while j + 1 < len(encoded) and encoded[j + 1] == encoded[i] and encoded[i]:
+                j += 1
+            # A line ending like "[xN]" gets its own "[x1]", so only the last marker is read as a count.
+            single = j == i and not REPEAT.match(encoded[i])
+            collapsed.append(encoded[i] if single else f"{encoded[i]} [x{j - i + 1}]")
+            i = j + 1
+        out.append(f"=={iso_date}==\n" + "\n".join(collapsed) + "\n")
+    return "\n".join(out), references, len(codes)
+
+
+def split(text):
+    """(codes, [(iso_date, body lines)]) of a normalized journal."""
+    data = text.encode('utf-8')
+    starts = list(HEADER.finditer(data))
+    preamble = data[:starts[0].start()] if starts else data
+    codes = {}
+    for line in preamble.decode('utf-8').split("\n"):
+        match = CODE_DEF.match(line)
+        if match:
+            codes[int(match.group(1))] = match.group(2)
+    entries = []
+    for i, match in enumerate(starts):
+        end = starts[i + 1].start() if i + 1 < len(starts) else len(data)
+        block = data[match.start():end].decode('utf-8')
+        date = parse_date(match.group(1).decode('utf-8'))
+        body = block.split("\n", 1)[1] if "\n" in block else ""
+        entries.append((date.isoformat() if date else None, body.rstrip("\n").split("\n")))
+    return codes, entries
+
+
+def expand(text):
+    """The (iso_date, canonical lines) entries a normalized journal stands for."""
+    codes, entries = split(text)
+    result, by_date = [], {}
+    for iso_date, lines in entries:
+        match = SAME_AS.match(lines[0]) if len(lines) == 1 else None
+        if match:
+            expanded = list(by_date[match.group(1)])
+        else:
+            expanded = []
+            for line in lines:
+                count = 1
+                repeat = REPEAT.match(line)
+                if repeat:
+                    line, count = repeat.group(1), int(repeat.group(2))
+                code = CODE_LINE.match(line)
+                if line.startswith(ESCAPE):
+                    line = line[len(ESCAPE):]
+                elif code:
+                    line = code.group(1) + codes[int(code.group(2))]
+                expanded += [line] * count
+            if expanded == [""]:
+                expanded = []
+        by_date[iso_date] = expanded
+        result.append((iso_date, expanded))
+    return result
+
+
+def update(path):
+    """Writes the normalized version of combined journal `path` next to it if it is smaller and
+    expanding it gives back every dated entry of `path`; otherwise removes any stale one so
+    the journal is read as it is. Returns the token counts, or None when nothing is written."""
+    start = time.perf_counter()
+    norm = normalized_path(path)
+    entries = dated_entries(path) if os.path.isfile(path) and os.path.getsize(path) else None
+    if entries is None:
+        if os.path.isfile(norm):
+            os.remove(norm)
+        return None
+    text, references, codes = normalize(entries)
+    try:
+        verified = expand(text) == entries
+    except (KeyError, ValueError, IndexError):
+        verified = False
+    with open(path, encoding='utf-8', errors='replace') as file:
+        before = text_tokens(file.read())
+    after = text_tokens(text)
+    if not verified or after >= before:
+        if os.path.isfile(norm):
+            os.remove(norm)
+        reason = "round trip lost entries" if not verified else "nothing to save"
+        print(f"normalize {path}: {reason}, reading it as it is")
+        return None
+    tmp_path = norm + f".{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(tmp_path, norm)
+    result = {"path": path, "days": len(entries), "references": references, "codes": codes,
+              "tokens_before": before, "tokens_after": after, "ratio": after / before,
+              "seconds": time.perf_counter() - start}
+    print(f"normalize {path}: {before} -> {after} tokens ({(1 - after / before) * 100:.0f}% saved, "
+          f"{references} of {len(entries)} days as references, {codes} codes), round trip verified "
+          f"in {result['seconds'] * 1000:.1f} ms")
+    return result
+
+
+# path -> ((mtime_ns, size), codes, {iso_date: body lines}) of the normalized journals read so far.
+parsed = {}
+
+
+def parsed_journal(path):
+    """The codes and day bodies of normalized journal `path`, parsed once per version of the file."""
+    st = os.stat(path)
+    version = (st.st_mtime_ns, st.st_size)
+    if path not in parsed or parsed[path][0] != version:
+        with open(path, encoding='utf-8') as file:
+            codes, entries = split(file.read())
+        parsed[path] = (version, codes, dict(entries))
+    return parsed[path][1], parsed[path][2]
+
+
+def with_context(path, content):
+    """`content`, a window of the normalized journal `path`, preceded by the codes and
+    referenced days it uses but does not contain itself."""
+    codes, bodies = parsed_journal(path)
+    present = {iso_date for iso_date, _ in split(content)[1]}
+    context = []
+    for iso_date in dict.fromkeys(match.group(1) for line in content.split("\n") for match in [SAME_AS.match(line)]
+                                  if match):
+        if iso_date not in present and iso_date in bodies:
+            context.append(f"=={iso_date}==\n" + "\n".join(bodies[iso_date]) + "\n")
+    defined = {int(match.group(1)) for match in map(CODE_DEF.match, content.split("\n")) if match}
+    used = sorted({int(code) for code in CODE.findall(content + "".join(context))} - defined)
+    if not context and not used:
+        return content
+    parts = [NOTE] + [f"§{code} = {codes[code]}" for code in used if code in codes]
+    if context:
+        parts.append("Referenced days:\n\n" + "\n".join(context))
+    return "\n".join(parts) + "\n\n" + content
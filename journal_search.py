@@ -0,0 +1,230 @@
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+from autogen_core.tools import FunctionTool
+
+from journal_index import load_index, to_iso
+
+COMBINE_DIR = "combine_files/combine"
+SOURCES = {
+    "journal-app": "journal-app.txt",
+    "journal-past": "journal-past.md",
+    "thought": "thought.txt",
+}
+INDEX = "search-index.json"
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("a an and are as at be but by for from had has have i in is it me my of on or so that the "
+                      "then this to was were with".split())
+K1 = 1.5
+B = 0.75
+SNIPPET_CHARS = 240
+
+
+def tokenize(text):
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class SearchIndex:
+    """BM25 inverted index over the dated entries of the combined journals.
+
+    Documents are day entries, identified by source, date and content hash and
+    stored with their byte range; postings map each term to its per-document
+    frequency. `update` only tokenizes entries whose content is new, moves the
+    byte range of entries a rebuild shifted, and skips sources whose size and
+    mtime did not change at all.
+    """
+
+    def __init__(self, directory=COMBINE_DIR, path=None):
+        self.directory = directory
+        self.path = path or os.path.join(directory, INDEX)
+        self.sources = {}
+        self.docs = {}
+        self.postings = {}
+        self.total_length = 0
+        self.loaded_mtime = None
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return self
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self.loaded_mtime:
+            return self
+        with open(self.path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        self.sources, self.docs, self.postings = data["sources"], data["docs"], data["postings"]
+        self.total_length = sum(doc["terms"] for doc in self.docs.values())
+        self.loaded_mtime = mtime
+        return self
+
+    def save(self):
+        tmp_path = self.path + f".{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({"sources": self.sources, "docs": self.docs, "postings": self.postings}, file)
+        os.replace(tmp_path, self.path)
+        self.loaded_mtime = os.stat(self.path).st_mtime_ns
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id)
+        self.total_length -= doc["terms"]
+        for term in doc["vocab"]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def add(self, doc_id, doc, text):
+        counts = Counter(tokenize(text))
+        doc["terms"] = sum(counts.values())
+        doc["vocab"] = list(counts)
+        self.docs[doc_id] = doc
+        self.total_length += doc["terms"]
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+
+    def update(self):
+        """Bring the index in line with the combined files; returns (added, removed) entry counts."""
+        self.load()
+        added = removed = 0
+        dirty = not os.path.isfile(self.path)
+        for source, file_name in SOURCES.items():
+            path = os.path.join(self.directory, file_name)
+            if not os.path.isfile(path):
+                stale = [doc_id for doc_id, doc in self.docs.items() if doc["source"] == source]
+                for doc_id in stale:
+                    self.remove(doc_id)
+                removed += len(stale)
+                dirty = dirty or source in self.sources
+                self.sources.pop(source, None)
+                continue
+            st = os.stat(path)
+            signature = [st.st_size, st.st_mtime_ns]
+            if self.sources.get(source) == signature:
+                continue
+
+            seen = set()
+            entries = load_index(path) if st.st_size else []
+            if entries:
+                with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for iso_date, offset, length in entries:
+                        block = mm[offset:offset + length]
+                        digest = hashlib.sha1(block).hexdigest()
+                        doc_id = f"{source}:{iso_date}:{digest[:16]}"
+                        seen.add(doc_id)
+                        if doc_id in self.docs:
+                            # Unchanged entry, possibly moved by a rebuild.
+                            self.docs[doc_id].update(offset=offset, length=length)
+                            continue
+                        self.add(doc_id, {"source": source, "date": iso_date, "offset": offset, "length": length},
+                                 block.decode('utf-8', errors='replace'))
+                        added += 1
+            stale = [doc_id for doc_id, doc in self.docs.items() if doc["source"] == source and doc_id not in seen]
+            for doc_id in stale:
+                self.remove(doc_id)
+            removed += len(stale)
+            self.sources[source] = signature
+            dirty = True
+        if dirty:
+            self.save()
+        return added, removed
+
+    def search(self, query, top_k=10, source="", start_date=None, end_date=None):
+        self.load()
+        terms = set(tokenize(query))
+        if not terms or not self.docs:
+            return []
+        count = len(self.docs)
+        average = self.total_length / count if count else 1.0
+        scores = Counter()
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                doc = self.docs[doc_id]
+                norm = K1 * (1 - B + B * doc["terms"] / average)
+                scores[doc_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        results = []
+        for doc_id, score in scores.most_common():
+            doc = self.docs[doc_id]
+            if source and doc["source"] != source:
+                continue
+            if (start_date or end_date) and doc["date"] is None:
+                continue
+            if start_date and doc["date"] < start_date or end_date and doc["date"] > end_date:
+                continue
+            results.append((score, doc))
+            if len(results) >= top_k:
+                break
+        return results
+
+    def snippet(self, doc, query):
+        path = os.path.join(self.directory, SOURCES[doc["source"]])
+        with open(path, 'rb') as file:
+            file.seek(doc["offset"])
+            text = file.read(doc["length"]).decode('utf-8', errors='replace')
+        body = text.split("\n", 1)[1] if "\n" in text else text
+        body = re.sub(r'\s+', " ", body).strip()
+        lowered = body.lower()
+        positions = [lowered.find(term) for term in tokenize(query) if term in lowered]
+        start = max(0, min(positions) - SNIPPET_CHARS // 4) if positions else 0
+        snippet = body[start:start + SNIPPET_CHARS]
+        return ("..." if start else "") + snippet + ("..." if start + SNIPPET_CHARS < len(body) else "")
+
+
+def update(directory=COMBINE_DIR):
+    start = time.perf_counter()
+    index = SearchIndex(directory)
+    added, removed = index.update()
+    print(f"search index: {added} entries added, {removed} removed, {len(index.docs)} indexed "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return index
+
+
+class SearchTool(FunctionTool):
+    def __init__(self, directory: str = COMBINE_DIR):
+        description = ("Searches all journals (journal-app, journal-past, thought) and returns the top_k best "
+                       "matching dated entries with a short snippet, ranked by BM25. Use it to find evidence such "
+                       "as every day mentioning a food or symptom instead of reading whole files. Optionally "
+                       "restrict to one source and to start_date/end_date (YYYY-MM-DD).")
+        super().__init__(name="Journal_Search", description=description, func=self.search)
+        self.index = SearchIndex(directory)
+
+    def search(self, query: str, top_k: int = 10, source: str = "", start_date: str = "", end_date: str = "") -> str:
+        if source and source not in SOURCES:
+            return f"unknown source {source!r}, use one of {', '.join(SOURCES)}"
+        try:
+            self.index.update()
+            results = self.index.search(query, max(1, min(top_k, 50)), source, to_iso(start_date), to_iso(end_date))
+        except Exception as e:
+            return f"Error searching journals: {str(e)}"
+        if not results:
+            return f"no entries match {query!r}"
+        return "\n".join(f"[{doc['date'] or '-'}] {doc['source']} ({score:.2f}): {self.index.snippet(doc, query)}"
+                         for score, doc in results)
+
+
+def main():
+    index = update()
+    if len(sys.argv) > 1:
+        query = " ".join(sys.argv[1:])
+        start = time.perf_counter()
+        results = index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        for score, doc in results:
+            print(f"[{doc['date']}] {doc['source']} ({score:.2f}): {index.snippet(doc, query)}")
+        print(f"{len(results)} results in {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
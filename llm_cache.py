@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Optional
+
+from autogen_core import CacheStore
+from autogen_core.models import CreateResult
+from autogen_ext.models.cache import CHAT_CACHE_VALUE_TYPE, ChatCompletionCache
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_MAX_AGE = float(os.getenv("LLM_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+# Seconds a process waits for another one (e.g. a batch worker) writing to the same store.
+CACHE_TIMEOUT = float(os.getenv("LLM_CACHE_TIMEOUT", "30"))
+
+
+def cache_enabled():
+    return os.getenv("LLM_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def encode_value(value):
+    if isinstance(value, CreateResult):
+        return json.dumps(value.model_dump(mode="json"))
+    return json.dumps([item.model_dump(mode="json") if isinstance(item, CreateResult) else item
+                       for item in value])
+
+
+class SqliteCacheStore(CacheStore[CHAT_CACHE_VALUE_TYPE]):
+    """Model response store in a local sqlite file with size/age-based LRU eviction.
+
+    `ChatCompletionCache` already hashes messages, tools and create args into the
+    key; `namespace` (the model name, and the endpoint when it is not the
+    provider's own) is prefixed so two models or endpoints never share an entry. Values are stored as JSON and handed back as strings, which
+    `ChatCompletionCache` turns back into `CreateResult`s. Several processes can
+    share the file: it is in WAL mode, writers wait for each other, and the LRU
+    bookkeeping of a hit is skipped rather than failing the call when they do not.
+    """
+
+    def __init__(self, path=CACHE_PATH, namespace="", max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=CACHE_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,
+            created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used)")
+        self.conn.commit()
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str, default: Optional[CHAT_CACHE_VALUE_TYPE] = None) -> Optional[CHAT_CACHE_VALUE_TYPE]:
+        now = time.time()
+        row = self.conn.execute("SELECT value, created FROM cache WHERE key = ?", (self._key(key),)).fetchone()
+        if row is None or (self.max_age and now - row[1] > self.max_age):
+            self.misses += 1
+            return default
+        self.hits += 1
+        try:
+            self.conn.execute("UPDATE cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, self._key(key)))
+            self.conn.commit()
+        except sqlite3.OperationalError:
+            # Locked by another process for longer than the timeout: the entry just looks older to eviction.
+            self.conn.rollback()
+        return row[0]
+
+    def set(self, key: str, value: CHAT_CACHE_VALUE_TYPE) -> None:
+        data = encode_value(value)
+        now = time.time()
+        try:
+            self.conn.execute("INSERT OR REPLACE INTO cache (key, value, size, created, last_used, hits) "
+                              "VALUES (?, ?, ?, ?, ?, 0)", (self._key(key), data, len(data), now, now))
+            self.evict(now)
+            self.conn.commit()
+        except sqlite3.OperationalError as e:
+            # The answer is still returned, it is only not cached.
+            self.conn.rollback()
+            print(f"llm cache [{self.namespace}]: not stored ({e})")
+
+    def evict(self, now=None):
+        now = now or time.time()
+        if self.max_age:
+            self.evictions += self.conn.execute("DELETE FROM cache WHERE created < ?",
+                                                (now - self.max_age,)).rowcount
+        if not self.max_bytes:
+            return
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM cache ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE key LIKE ?",
+                                          (self._key("%"),)).fetchone()
+        lookups = self.hits + self.misses
+        return {"namespace": self.namespace, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "evictions": self.evictions,
+                "entries": entries, "bytes": size}
+
+
+stores = []
+
+
+def cached(client, model, path=CACHE_PATH, base_url=None):
+    """Wrap `client` in a persistent response cache keyed on `model` and `base_url`, unless LLM_CACHE=0."""
+    if not cache_enabled():
+        return client
+    # Answers from another endpoint (e.g. the benchmark mock server) must never be served to a real run.
+    store = SqliteCacheStore(path, namespace=f"{model}@{base_url}" if base_url else model)
+    stores.append(store)
+    return ChatCompletionCache(client, store)
+
+
+def print_stats():
+    for store in stores:
+        stats = store.stats()
+        print(f"llm cache [{stats['namespace']}]: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%}), {stats['evictions']} evicted, "
+              f"{stats['entries']} entries / {stats['bytes']} bytes on disk")
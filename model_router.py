@@ -0,0 +1,161 @@
+import os
+import time
+from collections import Counter, deque
+
+from client_wrapper import ClientWrapper
+from context_compaction import message_tokens
+from teams import MODELS, ROUTES
+
+# A model is skipped for ROUTE_COOLDOWN seconds once, over its last ROUTE_WINDOW calls (at least
+# ROUTE_MIN_SAMPLES), the error rate reaches ROUTE_MAX_ERROR_RATE or the p95 latency ROUTE_MAX_P95 seconds.
+MAX_ERROR_RATE = float(os.getenv("ROUTE_MAX_ERROR_RATE", "0.5"))
+MAX_P95 = float(os.getenv("ROUTE_MAX_P95", "60"))
+WINDOW = int(os.getenv("ROUTE_WINDOW", "20"))
+MIN_SAMPLES = int(os.getenv("ROUTE_MIN_SAMPLES", "4"))
+COOLDOWN = float(os.getenv("ROUTE_COOLDOWN", "60"))
+
+
+class ModelHealth:
+    """Latency and failures of a model's recent calls, shared by every router."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = deque(maxlen=WINDOW)
+        self.down_until = 0.0
+        self.trips = 0
+
+    def record(self, seconds, ok):
+        self.calls.append((seconds, ok))
+        reason = self.unhealthy()
+        if reason:
+            # Skipped for a while, then tried again with a clean window.
+            self.down_until = time.monotonic() + COOLDOWN
+            self.trips += 1
+            self.calls.clear()
+        return reason
+
+    def unhealthy(self):
+        if len(self.calls) < MIN_SAMPLES:
+            return None
+        errors = sum(1 for _, ok in self.calls if not ok) / len(self.calls)
+        if errors >= MAX_ERROR_RATE:
+            return f"error rate {errors * 100:.0f}%"
+        latencies = sorted(seconds for seconds, ok in self.calls if ok)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        if p95 >= MAX_P95:
+            return f"p95 {p95:.1f}s"
+        return None
+
+    def available(self):
+        return time.monotonic() >= self.down_until
+
+
+health = {}
+# Every router created, for the end of run report.
+routers = []
+
+
+def health_of(model):
+    if model not in health:
+        health[model] = ModelHealth(model)
+    return health[model]
+
+
+def tier_for(tiers, tokens):
+    """The first tier whose max_prompt_tokens fits a prompt of `tokens` (the last one otherwise)."""
+    for tier in tiers:
+        if not tier.get("max_prompt_tokens") or tokens <= tier["max_prompt_tokens"]:
+            return tier
+    return tiers[-1]
+
+
+class RoutedClient(ClientWrapper):
+    """Picks the model of every call of one agent from the tier list of its role in ROUTES.
+
+    The tier is chosen by the size of the prompt; within it the first model
+    not cooling down is called, through `client_for(model)`. A call that fails
+    (after the pool's retries) moves on to the next model of the tier whose
+    context fits the prompt. Each decision is counted for the end of run report.
+    """
+
+    def __init__(self, role, agent, client_for, tiers=None):
+        self.tiers = tiers or ROUTES[role]
+        self.role = role
+        self.agent = agent
+        self.client_for = client_for
+        # Token counting and model info come from the model the role normally ends up on.
+        super().__init__(client_for(self.tiers[-1]["models"][0]))
+        self.decisions = Counter()
+        self.failovers = Counter()
+        routers.append(self)
+
+    def candidates(self, messages, tools=()):
+        tokens = sum(message_tokens(message) for message in messages) + sum(len(str(tool)) // 4 for tool in tools)
+        tier = tier_for(self.tiers, tokens)
+        # A model the prompt does not fit in would only fail; the primary is still tried if none fits.
+        models = [model for model in tier["models"]
+                  if tokens <= MODELS[model].get("context", tokens)] or tier["models"][:1]
+        ready = [model for model in models if health_of(model).available()]
+        # With every model cooling down, try them all anyway rather than fail the run.
+        return ready + [model for model in models if model not in ready], tier
+
+    def decide(self, model, tier, failed=None):
+        primary = tier["models"][0]
+        if model == primary:
+            reason = f"prompt <= {tier['max_prompt_tokens']} tokens" if tier.get("max_prompt_tokens") else "any prompt"
+        elif failed:
+            reason = f"failover from {failed}"
+        else:
+            reason = f"{primary} cooling down"
+        self.decisions[(model, reason)] += 1
+
+    async def create(self, messages, **kwargs):
+        models, tier = self.candidates(messages, kwargs.get("tools") or ())
+        for i, model in enumerate(models):
+            start = time.perf_counter()
+            try:
+                result = await self.client_for(model).create(messages, **kwargs)
+            except Exception as e:
+                tripped = health_of(model).record(time.perf_counter() - start, False)
+                if i == len(models) - 1:
+                    raise
+                self.failovers[(model, models[i + 1], tripped or type(e).__name__)] += 1
+                continue
+            if not result.cached:
+                health_of(model).record(time.perf_counter() - start, True)
+            self.decide(model, tier, models[i - 1] if i else None)
+            return result
+
+    def create_stream(self, messages, **kwargs):
+        # Streams are routed but not failed over: chunks already yielded cannot be taken back.
+        models, tier = self.candidates(messages, kwargs.get("tools") or ())
+        self.decide(models[0], tier)
+        return self.client_for(models[0]).create_stream(messages, **kwargs)
+
+    def stats(self):
+        return {"agent": self.agent, "role": self.role,
+                "decisions": [{"model": model, "reason": reason, "calls": count}
+                              for (model, reason), count in sorted(self.decisions.items())],
+                "failovers": [{"from": source, "to": target, "reason": reason, "count": count}
+                              for (source, target, reason), count in sorted(self.failovers.items())]}
+
+
+def routed(role, agent, client_for):
+    return RoutedClient(role, agent, client_for)
+
+
+def print_stats():
+    if not routers:
+        return
+    print("model routing:")
+    for router in routers:
+        stats = router.stats()
+        if not stats["decisions"] and not stats["failovers"]:
+            continue
+        calls = ", ".join(f"{d['model']} x{d['calls']} ({d['reason']})" for d in stats["decisions"])
+        print(f"  {stats['agent']:<26} {stats['role']:<12} {calls}")
+        for f in stats["failovers"]:
+            print(f"  {'':<26} {'':<12} failover {f['from']} -> {f['to']} x{f['count']} ({f['reason']})")
+    for model, state in sorted(health.items()):
+        if state.trips:
+            print(f"  {model}: skipped {state.trips} times for its error rate or latency")
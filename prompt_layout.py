@@ -0,0 +1,108 @@
+import os
+
+PREFIX_ENTRIES = int(os.getenv("PREFIX_ENTRIES", "60"))
+
+
+def shared_prefix_enabled():
+    return os.getenv("SHARED_PREFIX", "1").lower() not in ("0", "false", "no", "off")
+
+
+def shared_files(agents):
+    """Journal files read by more than one analyst, in the order they are first listed."""
+    counts = {}
+    for agent in agents[1:]:
+        for file_name in agent["files"]:
+            counts[file_name] = counts.get(file_name, 0) + 1
+    return [file_name for file_name, count in counts.items() if count > 1]
+
+
+def recent_window(file_tool, file_name, limit):
+    """The most recent entries of `file_name`, at most `limit` of them, that fit in one
+    File_Tool window: when they do not, the oldest are dropped rather than the newest."""
+    count = limit
+    window = file_tool.read(file_name, limit=count)
+    while window["next_offset"] is not None and count > 1:
+        # next_offset is how much of the window fitted; keep about that share of the entries.
+        count = max(1, min(count - 1, count * window["next_offset"] // window["total"]))
+        window = file_tool.read(file_name, limit=count)
+    if window["next_offset"] is not None:
+        # A single entry longer than a window is loaded whole.
+        window = file_tool.read(file_name, limit=1, max_bytes=0)
+    return window
+
+
+def build_prefix(file_tool, files, limit=PREFIX_ENTRIES):
+    """The journal content every analyst reading `files` gets first, byte for byte the same.
+
+    Providers cache prompt prefixes, so analysts whose prompts start with the
+    same journal only pay for it once; the role instructions come after it.
+    """
+    parts = ["SHARED JOURNAL CONTEXT",
+             f"The most recent entries of {', '.join(files)}, up to {limit} per file and dated as listed, "
+             "are loaded below for every analyst. Use file_tool only for entries outside those dates."]
+    for file_name in files:
+        try:
+            window = recent_window(file_tool, file_name, limit)
+        except OSError as e:
+            print(f"shared prefix: {file_name} not loaded ({e})")
+            continue
+        parts.append(f"== {file_name}: {len(window['dates'])} entries, "
+                     f"{window['dates'][0] if window['dates'] else '-'} to "
+                     f"{window['dates'][-1] if window['dates'] else '-'} ==")
+        parts.append(window["content"].rstrip())
+        parts.append(f"== end of {file_name} ==")
+    return "\n\n".join(parts) + "\n\nYOUR ROLE\n"
+
+
+def with_prefix(prefix, system_message):
+    return prefix + system_message
+
+
+# Prompt tokens of the model responses of this process and how many of them the provider served from
+# its prompt cache (usage.prompt_tokens_details.cached_tokens, which autogen's CreateResult drops).
+provider_usage = {"responses": 0, "prompt_tokens": 0, "cached_tokens": 0, "reported": 0}
+
+
+async def record_provider_usage(response):
+    """httpx response hook of the model clients (run_team.Clients)."""
+    if response.status_code != 200 or not response.url.path.endswith("/chat/completions") \
+            or not response.headers.get("content-type", "").startswith("application/json"):
+        return
+    await response.aread()
+    try:
+        usage = response.json().get("usage") or {}
+    except ValueError:
+        return
+    details = usage.get("prompt_tokens_details") or {}
+    provider_usage["responses"] += 1
+    provider_usage["prompt_tokens"] += usage.get("prompt_tokens") or 0
+    if details.get("cached_tokens") is not None:
+        provider_usage["reported"] += 1
+        provider_usage["cached_tokens"] += details["cached_tokens"]
+
+
+class PrefixStats:
+    """Tokens of the shared prefix, and the prompt tokens the provider reported as served from its cache."""
+
+    def __init__(self):
+        self.prefix_tokens = 0
+        self.analysts = 0
+        self.files = []
+
+    def record(self, prefix, analysts, files):
+        # Same rough 4 characters per token as the rest of the reports.
+        self.prefix_tokens = len(prefix) // 4 + 1
+        self.analysts = analysts
+        self.files = files
+
+    def print_stats(self):
+        if not self.analysts:
+            return
+        usage = provider_usage
+        if usage["reported"]:
+            cached = (f"provider cache served {usage['cached_tokens']} of {usage['prompt_tokens']} prompt tokens "
+                      f"({usage['reported']} of {usage['responses']} responses reported cached tokens)")
+        else:
+            cached = f"the provider reported no cached tokens in {usage['responses']} responses"
+        print(f"shared prefix: {self.prefix_tokens} tokens of {', '.join(self.files)} identical across "
+              f"{self.analysts} analysts; {cached}")
@@ -0,0 +1,500 @@
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import asyncio
+import os
+import sys
+
+from teams import DATA_DIR, DEFAULT_TEAM, MODELS, ROUTES, TEAMS
+
+# Seconds from import to the end of a --dry-run, which must not load autogen.
+STARTUP_BUDGET = float(os.getenv("STARTUP_BUDGET", "0.25"))
+HEAVY_MODULES = ("autogen_core", "autogen_agentchat", "autogen_ext", "openai", "numpy")
+
+
+def make_file_tool(data_dir):
+    from file_tool import FileTool
+    return FileTool(filepath=data_dir)
+
+
+def make_search_tool(data_dir):
+    from journal_search import SearchTool
+    return SearchTool(directory=data_dir)
+
+
+def make_stats_tool(data_dir):
+    from app_stats import StatsTool
+    return StatsTool(source=os.path.join(data_dir, "journal-app.txt"))
+
+
+TOOLS = {"file": make_file_tool, "search": make_search_tool, "stats": make_stats_tool}
+
+
+def routing_enabled():
+    return os.getenv("MODEL_ROUTING", "0").lower() in ("1", "true", "yes", "on")
+
+
+class Clients:
+    """One cached, rate-limited model client per model, created on first use.
+
+    `share` scales the model limits, for processes that split them between them.
+    Without `cache`, every call goes to the model (LLM_CACHE still applies otherwise).
+    """
+
+    def __init__(self, share=1.0, cache=True):
+        self.clients = {}
+        self.share = share
+        self.cache = cache
+
+    def get(self, model):
+        if model not in self.clients:
+            from autogen_ext.models.openai import OpenAIChatCompletionClient
+            from client_pool import pooled
+            from llm_cache import cached
+            from openai import DefaultAsyncHttpxClient
+            from prompt_layout import record_provider_usage
+
+            # Point the clients at another OpenAI-compatible endpoint, e.g. the benchmark mock server.
+            base_url = os.getenv("MODEL_BASE_URL")
+            endpoint = {"base_url": base_url} if base_url else {}
+            config = MODELS[model]
+            # Retries are the pool's job, so they share its backoff and limits.
+            # The response hook reads the provider's cached prompt token counts.
+            http_client = DefaultAsyncHttpxClient(event_hooks={"response": [record_provider_usage]})
+            client = OpenAIChatCompletionClient(model=model, api_key=os.getenv(config["api_key_env"]),
+                                                max_retries=0, http_client=http_client, **endpoint)
+            limits = {key: max(1, int(int(os.getenv(f"MODEL_{key.upper()}", config[key])) * self.share))
+                      for key in ("concurrency", "rpm")}
+            client = pooled(client, model, **limits)
+            self.clients[model] = cached(client, model, base_url=base_url) if self.cache else client
+        return self.clients[model]
+
+
+class Team:
+    """A team from TEAMS, built on first use: agents and their tools when an
+    agent is needed, the group chat and its selector only in chat mode."""
+
+    def __init__(self, name, tracer=None, clients=None, data_dir=DATA_DIR, analysis=None, usage=None, cassette=None):
+        from budgets import Usage
+        from findings import analysis_mode
+        from telemetry import Tracer
+
+        self.name = name
+        self.spec = TEAMS[name]
+        self.tracer = tracer or Tracer()
+        # A recording must hold real answers and latencies, not ones served from the response cache.
+        self.clients = clients or Clients(cache=cassette is None or cassette.mode != "record")
+        self.data_dir = data_dir
+        self.tools = {}
+        self._agents = None
+        self._group_chat = None
+        self.speaker_selector = None
+        self.prefix_stats = None
+        self.checkpoint = None
+        self.analysis = analysis or analysis_mode()
+        self.findings = None
+        self.delta_stats = None
+        self._plan = None
+        self.usage = usage or Usage()
+        self.plan_complete = None
+        self.cassette = cassette
+
+    def tool(self, name):
+        if name not in self.tools:
+            from telemetry import traced_tool
+            tool = TOOLS[name](self.data_dir)
+            if self.cassette is not None:
+                tool = self.cassette.tool(tool)
+            self.tools[name] = traced_tool(tool, self.tracer)
+        return self.tools[name]
+
+    def client(self, model, agent, role, cat="model"):
+        """The model client of one agent: metered against the run's budget and traced.
+        With MODEL_ROUTING on, `model` is ignored and each call is routed by `role`."""
+        from budgets import metered
+        from telemetry import traced
+
+        def client_for(model):
+            if self.cassette is None:
+                return metered(self.clients.get(model), model, self.usage)
+            replaying = self.cassette.mode == "replay"
+            client = self.cassette.client(None if replaying else self.clients.get(model), model, agent)
+            return metered(client, model, self.usage)
+
+        if routing_enabled():
+            from model_router import routed
+            return traced(routed(role, agent, client_for), agent, self.tracer, cat=cat)
+        return traced(client_for(model), agent, self.tracer, cat=cat)
+
+    async def prepare(self):
+        """Rebuilds the history rollup (summarize_history.py) before the run when an agent reads it and
+        it is missing or older than journal-past.md; its summaries are cached, so only new days cost calls."""
+        from summarize_history import MODEL, OUTPUT, SOURCE, cache_for, stale, summarize_history
+
+        output = os.path.join(self.data_dir, os.path.basename(OUTPUT))
+        source = os.path.join(self.data_dir, os.path.basename(SOURCE))
+        if not any(os.path.basename(OUTPUT) in agent["files"] for agent in self.spec["agents"]):
+            return
+        if not stale(source, output) or (self.cassette is not None and self.cassette.mode == "replay"):
+            return
+        try:
+            await summarize_history(self.clients.get(MODEL), source, output, cache_for(output))
+        except Exception as e:
+            # The analyst reads the previous rollup, or the raw history when there is none.
+            print(f"history rollup {output} not updated ({type(e).__name__}: {e})")
+
+    def system_message(self, agent):
+        """`agent`'s system message, with its fallbacks applied for the files that do not exist."""
+        message = agent["system_message"]
+        for file_name, (text, replacement) in agent.get("fallbacks", {}).items():
+            if not os.path.isfile(os.path.join(self.data_dir, file_name)):
+                message = message.replace(text, replacement)
+        return message
+
+    def analysis_plan(self):
+        """In delta or full analysis mode, how each analyst runs: "full", "delta" with the
+        windows of its new entries, or "reuse" of its stored findings. Empty otherwise."""
+        if self.analysis not in ("delta", "full"):
+            return {}
+        if self._plan is None:
+            from findings import DeltaStats, FindingsStore, day_after, file_state, plan_analyst
+
+            self.findings = FindingsStore(self.data_dir, self.name)
+            self.delta_stats = DeltaStats()
+            self._plan = {}
+            for agent in self.spec["agents"][1:]:
+                paths = {file_name: os.path.join(self.data_dir, file_name) for file_name in agent["files"]}
+                current = {file_name: file_state(path) for file_name, path in paths.items()}
+                record = self.findings.get(agent["name"])
+                mode, new = plan_analyst(record, paths, current, full=self.analysis == "full")
+                windows = {file_name: (through, self.tool("file").read(file_name, start_date=day_after(through)))
+                           for file_name, through in new.items()}
+                if any(window["next_offset"] is not None for _, window in windows.values()):
+                    # Too much is new to send as a delta.
+                    mode, windows = "full", {}
+                self._plan[agent["name"]] = {"mode": mode, "files": current, "new": windows, "record": record}
+                self.delta_stats.modes[agent["name"]] = mode
+                self.delta_stats.new_days += sum(len(window["dates"]) for _, window in windows.values())
+        return self._plan
+
+    def system_messages(self):
+        """Agent system messages; analysts sharing journal files get them as one identical leading prefix.
+        In delta mode an analyst with new entries gets its previous findings and those entries instead."""
+        from findings import delta_section
+        from prompt_layout import PrefixStats, build_prefix, shared_files, shared_prefix_enabled, with_prefix
+
+        agents = self.spec["agents"]
+        messages = [self.system_message(agent) for agent in agents]
+        plan = self.analysis_plan()
+        for i, agent in enumerate(agents):
+            if plan.get(agent["name"], {}).get("mode") == "delta":
+                entry = plan[agent["name"]]
+                messages[i] += delta_section(entry["record"]["findings"], entry["new"])
+        # Only analysts reading their journals in full take the shared prefix.
+        reading = [agent for i, agent in enumerate(agents)
+                   if i == 0 or plan.get(agent["name"], {}).get("mode", "full") == "full"]
+        files = shared_files(reading) if shared_prefix_enabled() else []
+        if not files:
+            return messages
+        prefix = build_prefix(self.tool("file"), files)
+        sharing = [i for i, agent in enumerate(agents) if i > 0 and agent in reading and set(files) <= set(agent["files"])]
+        for i in sharing:
+            messages[i] = with_prefix(prefix, messages[i])
+        self.prefix_stats = PrefixStats()
+        self.prefix_stats.record(prefix, len(sharing), files)
+        return messages
+
+    @property
+    def agents(self):
+        if self._agents is None:
+            from autogen_agentchat.agents import AssistantAgent
+            from context_compaction import make_context
+            from findings import FindingsAgent
+
+            system_messages = self.system_messages()
+            plan = self.analysis_plan()
+            self._agents = []
+            for i, agent in enumerate(self.spec["agents"]):
+                entry = plan.get(agent["name"])
+                if entry is not None and entry["mode"] == "reuse":
+                    dates = [state["through"] for state in entry["files"].values() if state and "through" in state]
+                    through = max(dates, default=None)
+                    self._agents.append(FindingsAgent(agent["name"], agent["description"],
+                                                      entry["record"]["findings"], through))
+                    continue
+                self._agents.append(AssistantAgent(
+                    name=agent["name"],
+                    model_client=self.client(agent["model"], agent["name"], "coordinator" if i == 0 else "analyst"),
+                    description=agent["description"],
+                    system_message=system_messages[i],
+                    tools=[self.tool(tool) for tool in agent["tools"]] or None,
+                    model_context=make_context(agent["name"], "coordinator" if i == 0 else "analyst",
+                                               self.spec["agents"][0]["name"]),
+                    # Stored findings must be the analyst's own summary, not a raw tool result.
+                    reflect_on_tool_use=True if plan else None,
+                ))
+        return self._agents
+
+    async def save_findings(self):
+        """Stores the answer of every analyst that analyzed its journals in this run."""
+        from findings import last_answer
+
+        plan = self.analysis_plan()
+        if not plan or self._agents is None:
+            return
+        for agent in self.analysts:
+            entry = plan[agent.name]
+            if entry["mode"] == "reuse":
+                continue
+            answer = last_answer(await agent.model_context.save_state())
+            if answer:
+                self.findings.put(agent.name, answer, entry["files"], full=entry["mode"] == "full")
+        self.findings.save()
+
+    def summary(self, messages, stop_reason):
+        from budgets import run_summary
+        run_id = self.checkpoint.run_id if self.checkpoint is not None else self.tracer.run_id
+        summary = run_summary(run_id, self.name, self.spec["agents"][0]["name"],
+                              self.spec.get("required_sections", []), self.usage, messages, stop_reason)
+        if routing_enabled():
+            from model_router import routers
+            summary["routing"] = [router.stats() for router in routers if router.agent in self.agent_names()]
+        return summary
+
+    def agent_names(self):
+        return {agent["name"] for agent in self.spec["agents"]} | {"selector"}
+
+    @property
+    def coordinator(self):
+        return self.agents[0]
+
+    @property
+    def analysts(self):
+        return self.agents[1:]
+
+    @property
+    def group_chat(self):
+        if self._group_chat is None:
+            from autogen_agentchat.teams import SelectorGroupChat
+            from budgets import BudgetTermination, PlanComplete
+            from context_compaction import make_context
+            from speaker_selector import make_selector
+
+            self.speaker_selector = make_selector(self.coordinator.name, [agent.name for agent in self.analysts])
+            selector_func = self.speaker_selector
+            if self.checkpoint is not None:
+                selector_func = self.checkpoint.selector(selector_func)
+            selector_client = self.client(self.spec["selector_model"], "selector", "selector", cat="selector")
+            # Done when the coordinator approves a plan with every required section, or out of budget.
+            self.plan_complete = PlanComplete(self.coordinator.name, self.spec.get("required_sections", []))
+            self._group_chat = SelectorGroupChat(participants=self.agents, model_client=selector_client,
+                                                 selector_prompt=self.spec["selector_prompt"],
+                                                 selector_func=self.tracer.selector(selector_func),
+                                                 model_context=make_context("selector", "selector"),
+                                                 termination_condition=(self.plan_complete
+                                                                        | BudgetTermination(self.usage)))
+        return self._group_chat
+
+
+def build_team(name=DEFAULT_TEAM, **kwargs):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return Team(name, **kwargs)
+
+
+async def drain(stream):
+    """Runs a run_stream to the end without printing it and returns its TaskResult."""
+    result = None
+    async for result in stream:
+        pass
+    return result
+
+
+async def run_chat(team, task, resume=None, console=True):
+    """The group chat run, checkpointed to .checkpoints/<run-id>.jsonl; with `resume`, the
+    checkpointed run of that id continues after its last completed turn, and the result
+    holds the restored messages followed by the new ones."""
+    from autogen_agentchat.ui import Console
+    from checkpoint import Checkpoint, checkpoint_enabled, load, team_state, turns
+
+    output = Console if console else drain
+    if resume is None and not checkpoint_enabled():
+        return await output(team.tracer.observe(team.group_chat.run_stream(task=task)))
+    team.checkpoint = Checkpoint(resume or team.tracer.run_id)
+    messages = []
+    if resume is None:
+        team.checkpoint.start(team.name, task, team.data_dir)
+        stream = team.group_chat.run_stream(task=task)
+    else:
+        _, messages, _ = load(resume)
+        names = [agent.name for agent in team.agents]
+        fresh = await team.group_chat.save_state()
+        manager = next(key for key in fresh["agent_states"] if key not in names)
+        await team.group_chat.load_state(team_state(messages, names, manager))
+        done = len(turns(messages))
+        team.checkpoint.resume(done)
+        team.usage.turns = done
+        print(f"resuming run {resume} after {done} completed turns")
+        stream = team.group_chat.run_stream()
+    if console:
+        print(f"checkpoint {team.checkpoint.path} (resume with --resume {team.checkpoint.run_id})")
+    try:
+        result = await output(team.tracer.observe(team.checkpoint.observe(stream)))
+        team.checkpoint.end(result.stop_reason)
+    finally:
+        team.checkpoint.close()
+    if messages:
+        from autogen_agentchat.base import TaskResult
+        result = TaskResult(messages=[*messages, *result.messages], stop_reason=result.stop_reason)
+    return result
+
+
+async def run_team(name=DEFAULT_TEAM, task=None, resume=None, analysis=None, cassette=None):
+    """Runs team `name` on `task` (default: the team's task) and prints what it cost.
+    With a Cassette (default: from CASSETTE_RECORD/CASSETTE_REPLAY), the model calls and tool
+    results are recorded, or replayed without the network with the recorded team and task."""
+    from budgets import budget_stop, print_summary, write_summary
+    from cassette import cassette_from_env
+    from client_pool import print_stats as print_pool_stats
+    from context_compaction import print_stats as print_context_stats
+    from fanout import run_fanout, run_mode
+    from llm_cache import print_stats
+    from telemetry import finish
+
+    if resume is not None:
+        from checkpoint import load
+
+        run, _, ended = load(resume)
+        if ended is not None:
+            print(f"run {resume} already finished ({ended['stop_reason']})")
+            return None
+        name, task = run["team"], run["task"]
+        data_dir = run.get("data_dir", DATA_DIR)
+    else:
+        data_dir = DATA_DIR
+    cassette = cassette or cassette_from_env()
+    if cassette is not None and cassette.mode == "replay":
+        name, task, data_dir = cassette.meta["team"], cassette.meta["task"], cassette.meta["data_dir"]
+    team = build_team(name, data_dir=data_dir, analysis=analysis, cassette=cassette)
+    task = task or team.spec["task"]
+    await team.prepare()
+    if cassette is not None:
+        cassette.start(name, task, data_dir)
+    if run_mode() == "fanout" and resume is None:
+        result = await run_fanout(team.coordinator, team.analysts, task, tracer=team.tracer, usage=team.usage)
+        summary = team.summary([result], budget_stop(team.usage))
+    else:
+        result = await run_chat(team, task, resume)
+        summary = team.summary(result.messages, result.stop_reason)
+    await team.save_findings()
+    if cassette is not None:
+        cassette.save()
+        cassette.print_stats()
+    print_stats()
+    print_pool_stats()
+    print_context_stats()
+    if routing_enabled():
+        from model_router import print_stats as print_routing_stats
+        print_routing_stats()
+    if "file" in team.tools:
+        stats = team.tools["file"].stats()
+        print(f"file tool memo: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate'] * 100:.0f}%), "
+              f"{stats['bytes_saved'] / 1024:.1f} KB served without a disk read")
+    if team.prefix_stats is not None:
+        team.prefix_stats.print_stats()
+    if team.delta_stats is not None:
+        team.delta_stats.print_stats()
+    if team.speaker_selector is not None:
+        stats = team.speaker_selector.stats()
+        print(f"speaker selection: {stats['rule']} by rule, {stats['llm']} by LLM fallback")
+    print_summary(summary, write_summary(summary))
+    finish(team.tracer)
+    return result
+
+
+def dry_run(name, data_dir=DATA_DIR):
+    """Prints what running `name` would create and checks its keys and files, without importing autogen."""
+    spec = TEAMS[name]
+    agents = spec["agents"]
+    print(f"team {name}: {spec['description']}")
+    print(f"task: {spec['task']}")
+    for i, agent in enumerate(agents):
+        role = "coordinator" if i == 0 else "analyst"
+        print(f"  {agent['name']:<26} {role:<12} {agent['model']:<18} "
+              f"tools: {', '.join(agent['tools']) or '-'}  reads: {', '.join(agent['files']) or '-'}")
+    models = sorted({agent["model"] for agent in agents} | {spec["selector_model"]})
+    if routing_enabled():
+        routed = {model for tiers in ROUTES.values() for tier in tiers for model in tier["models"]}
+        models = sorted(set(models) | routed)
+    problems = []
+    for model in models:
+        key = MODELS[model]["api_key_env"]
+        if not os.getenv(key) and not os.getenv("MODEL_BASE_URL"):
+            problems.append(f"{key} is not set (needed for {model})")
+    # Built by Team.prepare, or replaced by the raw journal when it cannot be.
+    prepared = {file_name for agent in agents for file_name in agent.get("fallbacks", {})}
+    for file_name in sorted({file_name for agent in agents for file_name in agent["files"]} - prepared):
+        if not os.path.isfile(os.path.join(data_dir, file_name)):
+            problems.append(f"{os.path.join(data_dir, file_name)} does not exist yet")
+    print(f"clients: {', '.join(models)} (selector: {spec['selector_model']}, chat mode only"
+          f"{'; routed per call by role' if routing_enabled() else ''})")
+    from prompt_layout import shared_files, shared_prefix_enabled
+
+    files = shared_files(agents) if shared_prefix_enabled() else []
+    if files:
+        print(f"shared prompt prefix: {', '.join(files)}")
+    for problem in problems:
+        print(f"  warning: {problem}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an agent team")
+    parser.add_argument("--team", default=DEFAULT_TEAM, choices=list(TEAMS))
+    parser.add_argument("--task", default=None, help="task for the coordinator (default: the team's task)")
+    parser.add_argument("--dry-run", action="store_true", help="show and check the team without running it")
+    parser.add_argument("--list", action="store_true", help="list the teams")
+    parser.add_argument("--resume", metavar="RUN_ID", default=None,
+                        help="continue a checkpointed chat run after its last completed turn")
+    parser.add_argument("--record", metavar="FILE", default=None,
+                        help="record every model response and tool result of the run to a cassette")
+    parser.add_argument("--replay", metavar="FILE", default=None,
+                        help="rerun a recorded cassette (its team and task) without calling any model")
+    parser.add_argument("--replay-latency", type=float, default=0.0, metavar="X",
+                        help="sleep X times each recorded model and tool latency when replaying (default 0)")
+    parser.add_argument("--replay-tools", action="store_true",
+                        help="serve tool results from the cassette too, instead of running the tools")
+    parser.add_argument("--analysis", choices=("off", "delta", "full"), default=None,
+                        help="delta: analysts only get entries new since their stored findings; "
+                             "full: re-analyze everything and store the findings (default: ANALYSIS_MODE or off)")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, spec in TEAMS.items():
+            print(f"{name:<18} {len(spec['agents'])} agents  {spec['description']}")
+        return
+    if args.dry_run:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        dry_run(args.team)
+        elapsed = time.perf_counter() - STARTED
+        heavy = [module for module in HEAVY_MODULES if module in sys.modules]
+        print(f"startup {elapsed * 1000:.1f} ms (budget {STARTUP_BUDGET * 1000:.0f} ms), "
+              f"heavy imports: {', '.join(heavy) or 'none'}")
+        if elapsed > STARTUP_BUDGET or heavy:
+            sys.exit(1)
+        return
+    cassette = None
+    if args.record or args.replay:
+        from cassette import Cassette
+        cassette = (Cassette(args.replay, "replay", latency=args.replay_latency, replay_tools=args.replay_tools)
+                    if args.replay else Cassette(args.record, "record"))
+    asyncio.run(run_team(args.team, args.task, resume=args.resume, analysis=args.analysis, cassette=cassette))
+
+
+if __name__ == "__main__":
+    main()
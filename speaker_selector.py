@@ -0,0 +1,95 @@
+import os
+import re
+
+from autogen_agentchat.messages import BaseChatMessage
+
+# "1. AppJournalAnalyst : <task>", tolerating markdown emphasis around the name.
+ASSIGNMENT = re.compile(r'^\s*\d+[.)]\s*[*_`]*\s*(\w+)\s*[*_`]*\s*:', re.M)
+
+
+def parse_assignments(text, names):
+    """(agent, task) pairs from the `1. <agent> : <task>` lines in `text`, in order.
+
+    A task runs until the next numbered line, so multi-line assignments are kept
+    whole. Lines naming anything other than `names` are ignored.
+    """
+    matches = list(ASSIGNMENT.finditer(text))
+    assigned = []
+    for i, match in enumerate(matches):
+        name = match.group(1)
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        if name in names and name not in [agent for agent, _ in assigned]:
+            assigned.append((name, text[match.end():end].strip()))
+    return assigned
+
+
+def selector_mode():
+    return os.getenv("SELECTOR_MODE", "rules").lower()
+
+
+class RuleSelector:
+    """Deterministic speaker selection following the protocol in the selector prompt.
+
+    The coordinator speaks first; the analysts named in its latest
+    `1. <agent> : <task>` lines then speak in the order they were assigned, and
+    the turn returns to the coordinator once all of them have answered (or after
+    each one with `return_to_coordinator`). When the thread does not fit the
+    protocol, None is returned so SelectorGroupChat falls back to the LLM.
+    """
+
+    def __init__(self, coordinator, analysts, return_to_coordinator=False):
+        self.coordinator = coordinator
+        self.analysts = list(analysts)
+        self.return_to_coordinator = return_to_coordinator
+        self.decisions = []
+
+    def parse_assignments(self, text):
+        return [name for name, _ in parse_assignments(text, self.analysts)]
+
+    def mentioned(self, text):
+        return [name for name in self.analysts if name in text]
+
+    def next_speaker(self, messages):
+        chat = [message for message in messages if isinstance(message, BaseChatMessage)]
+        if not any(message.source == self.coordinator for message in chat):
+            return self.coordinator
+
+        last = chat[-1]
+        assigned, start = [], None
+        for i in range(len(chat) - 1, -1, -1):
+            if chat[i].source == self.coordinator:
+                assigned = self.parse_assignments(chat[i].to_text())
+                if assigned:
+                    start = i
+                    break
+        answered = {message.source for message in chat[start + 1:]} if start is not None else set()
+        pending = [name for name in assigned if name not in answered]
+
+        if last.source == self.coordinator:
+            if self.parse_assignments(last.to_text()):
+                return pending[0] if pending else None
+            named = [name for name in self.mentioned(last.to_text()) if name in pending]
+            if len(named) == 1:
+                return named[0]
+            return None
+        if last.source in self.analysts:
+            if pending and not self.return_to_coordinator:
+                return pending[0]
+            return self.coordinator
+        return self.coordinator
+
+    def __call__(self, messages):
+        speaker = self.next_speaker(messages)
+        self.decisions.append(speaker or "llm")
+        return speaker
+
+    def stats(self):
+        fallbacks = self.decisions.count("llm")
+        return {"turns": len(self.decisions), "rule": len(self.decisions) - fallbacks, "llm": fallbacks}
+
+
+def make_selector(coordinator, analysts):
+    """The selector_func for SelectorGroupChat, or None when SELECTOR_MODE=llm."""
+    if selector_mode() == "llm":
+        return None
+    return RuleSelector(coordinator, analysts)
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import date
+
+from dotenv import load_dotenv
+from autogen_core.models import SystemMessage, UserMessage
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+from journal_index import iter_entries
+from llm_cache import cached
+
+SOURCE = "combine_files/combine/journal-past.md"
+OUTPUT = "combine_files/combine/journal-past-summary.md"
+CACHE = ".cache/history_summaries.json"
+MODEL = "gemini-2.0-flash"
+
+# Days shorter than this are copied verbatim, a summary would not be shorter.
+MIN_CHARS = 400
+CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+PROMPT_VERSION = "1"
+
+DAY_PROMPT = """Summarize this health journal day in at most 5 short bullet points.
+Keep symptoms and their severity, foods, supplements, medications, treatments tried and their effect,
+sleep, exercise and notable life events. Drop everything else. Do not add advice."""
+
+ROLLUP_PROMPT = """Combine these health journal summaries covering {period} into at most 8 short bullet points.
+Keep recurring symptoms, triggers, treatments tried and their outcome, and changes over the period.
+Mention dates only for one-off events. Do not add advice."""
+
+
+def stale(source=SOURCE, output=OUTPUT):
+    """Whether the rollup of `source` is missing or older than it."""
+    try:
+        return os.stat(output).st_mtime_ns < os.stat(source).st_mtime_ns
+    except FileNotFoundError:
+        return os.path.isfile(source)
+
+
+def cache_for(output):
+    # Other journal trees (batch profiles) keep their own cache, which only holds their own summaries.
+    return (CACHE if os.path.abspath(output) == os.path.abspath(OUTPUT)
+            else os.path.join(os.path.dirname(output), ".history_summaries.json"))
+
+
+def content_key(kind, text):
+    return hashlib.sha1(f"{PROMPT_VERSION}:{kind}:{text}".encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, path=CACHE):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    self.entries = json.load(file)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable summary cache {path}: {e}")
+
+    def get(self, key):
+        if key in self.entries:
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key, summary):
+        self.entries[key] = summary
+
+    def save(self, keep):
+        # Only summaries still referenced by the current journal are kept.
+        self.entries = {key: value for key, value in self.entries.items() if key in keep}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + f".{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.entries, file)
+        os.replace(tmp_path, self.path)
+
+
+class HistorySummarizer:
+    """Map-reduce summary of the combined history journal.
+
+    Every day is summarized on its own (map), days are rolled up per ISO week and
+    weeks per month (reduce). Each summary is cached under the hash of its input,
+    so after the first run only new or edited days, and the weeks and months
+    containing them, go to the model again.
+    """
+
+    def __init__(self, client, cache, concurrency=CONCURRENCY):
+        self.client = client
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.used = set()
+        self.calls = 0
+
+    async def summarize(self, kind, prompt, text):
+        key = content_key(kind, prompt + text)
+        self.used.add(key)
+        summary = self.cache.get(key)
+        if summary is not None:
+            return summary
+        async with self.semaphore:
+            result = await self.client.create([SystemMessage(content=prompt),
+                                               UserMessage(content=text, source="user")])
+        self.calls += 1
+        summary = result.content.strip() if isinstance(result.content, str) else str(result.content)
+        self.cache.set(key, summary)
+        return summary
+
+    async def summarize_day(self, iso_date, text):
+        if len(text) < MIN_CHARS:
+            return text
+        return await self.summarize("day", DAY_PROMPT, text)
+
+    async def rollup(self, period, parts):
+        if len(parts) == 1 and len(parts[0][1]) < MIN_CHARS:
+            return parts[0][1]
+        text = "\n\n".join(f"[{label}]\n{summary}" for label, summary in parts)
+        return await self.summarize("rollup", ROLLUP_PROMPT.format(period=period), text)
+
+    async def run(self, days):
+        summaries = await asyncio.gather(*(self.summarize_day(iso_date, text) for iso_date, text in days))
+
+        weeks = OrderedDict()
+        for (iso_date, _), summary in zip(days, summaries):
+            year, week, _ = date.fromisoformat(iso_date).isocalendar()
+            weeks.setdefault((year, week), []).append((iso_date, summary))
+        week_keys = list(weeks)
+        week_rollups = await asyncio.gather(*(
+            self.rollup(f"the week starting {date.fromisocalendar(*key, 1).isoformat()}", weeks[key])
+            for key in week_keys))
+
+        months = OrderedDict()
+        for key, rollup in zip(week_keys, week_rollups):
+            first_day = weeks[key][0][0]
+            months.setdefault(first_day[:7], []).append((f"Week of {date.fromisocalendar(*key, 1).isoformat()}", rollup))
+        month_keys = list(months)
+        month_rollups = await asyncio.gather(*(
+            self.rollup(date.fromisoformat(key + "-01").strftime("%B %Y"), months[key]) for key in month_keys))
+        return [(key, rollup, months[key]) for key, rollup in zip(month_keys, month_rollups)]
+
+
+def render(months):
+    lines = ["# Journal history rollup", ""]
+    for key, rollup, weeks in months:
+        lines += [f"## {date.fromisoformat(key + '-01').strftime('%B %Y')}", "", rollup, ""]
+        for label, week_rollup in weeks:
+            lines += [f"### {label}", "", week_rollup, ""]
+    return "\n".join(lines)
+
+
+async def summarize_history(client, source=SOURCE, output=OUTPUT, cache_path=CACHE):
+    start = time.perf_counter()
+    days = list(iter_entries(source))
+    cache = SummaryCache(cache_path)
+    summarizer = HistorySummarizer(client, cache)
+    months = await summarizer.run(days)
+
+    tmp_output = output + f".{os.getpid()}.tmp"
+    with open(tmp_output, 'w', encoding='utf-8') as outfile:
+        outfile.write(render(months))
+    os.replace(tmp_output, output)
+    cache.save(summarizer.used)
+
+    elapsed = time.perf_counter() - start
+    print(f"summarized {len(days)} days into {len(months)} months in {output} "
+          f"[{summarizer.calls} model calls, {cache.hits} cached, {elapsed:.1f}s, "
+          f"{os.path.getsize(source)} -> {os.path.getsize(output)} bytes]")
+
+
+async def main():
+    load_dotenv()
+    if not os.path.isfile(SOURCE):
+        print(f"File not found: {SOURCE}")
+        return
+    client = cached(OpenAIChatCompletionClient(
+        model=MODEL,
+        api_key=os.getenv("GEMINI_API_KEY")
+    ), MODEL)
+    await summarize_history(client)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
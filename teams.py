@@ -0,0 +1,410 @@
+"""Agent teams, declared as data.
+
+The first agent of a team is its coordinator, the others are its analysts. An agent names its model (a key of
+MODELS), the tools it gets (keys of run_team.TOOLS) and the combined journal
+files it reads. Nothing here imports autogen, so listing and checking teams
+stays fast; run_team.py builds clients, tools and agents only when a team runs.
+"""
+
+DATA_DIR = "./combine_files/combine"
+
+# Limits are shared by every agent using the model (client_pool.py); rpm is requests per minute.
+# price is USD per million prompt and completion tokens, for the run cost budget (budgets.py).
+# context is the model's context window in tokens; routing never sends it a longer prompt.
+MODELS = {
+    "o3-mini": {"api_key_env": "OPENAI_API_KEY", "concurrency": 8, "rpm": 500, "price": (1.10, 4.40),
+                "context": 200_000},
+    "gemini-2.0-flash": {"api_key_env": "GEMINI_API_KEY", "concurrency": 8, "rpm": 2000, "price": (0.10, 0.40),
+                         "context": 1_048_576},
+    "gpt-4o-mini": {"api_key_env": "OPENAI_API_KEY", "concurrency": 8, "rpm": 500, "price": (0.15, 0.60),
+                    "context": 128_000},
+}
+
+# With MODEL_ROUTING=1 every call picks its model here instead of the agent's "model" (model_router.py):
+# the first tier of the agent's role whose max_prompt_tokens fits the prompt, then the first model of
+# it that is not cooling down after errors or slow answers; a failed call moves on to the next one.
+# Models whose context is smaller than the prompt are left out, so a full-history prompt only fails
+# over from gemini-2.0-flash to o3-mini while it fits in o3-mini's 200k tokens.
+ROUTES = {
+    "selector": [{"models": ["gemini-2.0-flash", "gpt-4o-mini"]}],
+    # Assignments and small deltas on the fast models, full journals on the large-context ones.
+    "analyst": [{"max_prompt_tokens": 100_000, "models": ["gemini-2.0-flash", "gpt-4o-mini"]},
+                {"models": ["gemini-2.0-flash", "o3-mini"]}],
+    # The coordinator's first turn is its instructions and the task; the synthesis has every analysis.
+    "coordinator": [{"max_prompt_tokens": 2_000, "models": ["gemini-2.0-flash", "gpt-4o-mini"]},
+                    {"models": ["o3-mini", "gemini-2.0-flash"]}],
+}
+
+HEALTH_PLAN_SELECTOR = """
+Select the most appropriate agent to respond next in this health analysis system.
+
+AGENT ROLES:
+- MainCoordinator: Directs the overall process, assigns tasks to specialized agents, and creates a comprehensive health plan after all analyses are complete.
+- AppJournalAnalyst: Analyzes structured app data for symptom patterns, diet correlations, and documented management strategies.
+- HistoricalJournalAnalyst: Examines historical health records for long-term patterns, chronic issues, and past treatment effectiveness.
+- UserInsightsAnalyst: Evaluates user's personal observations, preferences, and subjective experiences.
+- User: The person seeking health assistance.
+
+SELECTION GUIDELINES:
+1. MainCoordinator should always go first to establish direction.
+2. Specialized analysts (App, Historical, UserInsights) should only begin after being assigned tasks.
+3. Return to MainCoordinator after each analysis is complete to assess next steps and finally synthesize the health plan.
+4. Select User when direct input or clarification is needed.
+
+Current conversation context:
+{history}
+
+Based on the current state of the conversation, select ONE agent from {participants} to perform the next task.
+"""
+
+# HistoricalJournalAnalyst's first step, on the rollup summarize_history.py builds or on the raw history.
+HISTORY_SUMMARY_STEP = """1. Use file_tool to access the file 'journal-past-summary.md' at ./combine_files/combine/journal-past-summary.md,
+       a monthly and weekly rollup of the full history. Only if you need the details of a specific period,
+       read 'journal-past.md' with start_date/end_date set to that period."""
+HISTORY_RAW_STEP = "1. Use file_tool to access the file 'journal-past.md' at ./combine_files/combine/journal-past.md"
+
+HEALTH_PLAN = {
+    "description": "daily health plan from the app journal, the journal history and the user's own thoughts (main.py)",
+    "task": "help me build a plan for tomorrow",
+    "selector_model": "gemini-2.0-flash",
+    # Headings the coordinator's APPROVE message must have for the run to stop as complete.
+    "required_sections": ["DAILY HEALTH PLAN", "Daily Schedule"],
+    "selector_prompt": HEALTH_PLAN_SELECTOR,
+    "agents": [
+        {
+            "name": "MainCoordinator",
+            "model": "o3-mini",
+            "description": "This is the main agent who is supposed to go first when given a task by the user and also synthesizes the final health plan.",
+            "system_message": """
+    You are the main coordinator and health plan synthesizer. Your job is to direct the health analysis process, 
+    request information from specialized agents, and create a final daily health plan.
+    Your agents are: 
+        - AppJournalAnalyst: analyze structured journal entries from the health tracking app
+        - HistoricalJournalAnalyst: analyze historical journal entries that are less structured and from an earlier time period.
+        - UserInsightsAnalyst: analyze the user's own observations, patterns, and suggestions collected throughout their health management journey.
+
+    When assigning tasks, use this format:
+    1. <agent> : <task>
+ 
+    After all agents have completed their tasks, you will synthesize their findings into a comprehensive daily health plan.
+    
+    PLAN SYNTHESIS PROCESS:
+    1. Review all analyses from the specialized agents
+    2. Identify overlapping patterns and insights across analyses
+    3. Prioritize issues based on:
+       - Severity and frequency of symptoms
+       - User's stated priorities and preferences
+       - Historical effectiveness of management strategies
+    4. Create a realistic daily schedule with specific recommendations
+    5. Ensure the plan addresses both immediate symptom management and long-term health improvements
+    
+    FORMAT YOUR HEALTH PLAN:
+    
+    # DAILY HEALTH PLAN
+    
+    ## Summary of Key Insights
+    [Brief overview of most important patterns and triggers identified across all analyses]
+    
+    ## Daily Schedule
+    - Morning Routine: [Specific recommendations with times]
+    - Dietary Plan: [Meals and snacks with specific foods to include/avoid]
+    - Activity Plan: [Exercise and rest recommendations]
+    - Evening Routine: [Wind-down activities and sleep preparation]
+    
+    ## Symptom Management Strategies
+    [List specific approaches for managing primary symptoms]
+    
+    ## Monitoring Plan
+    [Suggest metrics to track and how to monitor progress]
+    
+    ## Adaptation Guidelines
+    [Provide guidance on how to adjust the plan based on daily variations in symptoms]
+    
+    End with "APPROVE" when the daily health plan is complete.
+    """,
+            "tools": [],
+            "files": [],
+        },
+        # to do: explain how rating works, from 1 to 4, and how it works when a rating goes up or down.
+        # create agent where they only receive context from agents response and not their content (journal content)
+        {
+            "name": "AppJournalAnalyst",
+            "model": "gemini-2.0-flash",
+            "description": "This agent specializes in analyzing structured journal entries from health tracking apps, identifying patterns and extracting key health insights from formatted data.",
+            "system_message": """
+    You analyze structured journal entries from the health tracking app using file_tool.
+    
+    STEPS TO FOLLOW:
+    1. Use file_tool to access the file 'journal-app.txt' at ./combine_files/combine/journal-app.txt
+    2. Analyze the data for:
+       - Daily patterns in symptoms and discomfort
+       - Correlations between diet and health outcomes
+       - Exercise patterns and effects
+       - Medication usage and effectiveness
+    3. Identify the most consistent patterns that appear in the data
+    4. Look for triggers that consistently cause health issues
+    5. Note any successful management strategies documented
+    
+    FORMAT YOUR RESPONSE:
+    - Key Patterns: [List 3-5 main patterns]
+    - Triggers: [List specific triggers]
+    - Effective Strategies: [List what has worked]
+    - Recommendations: [2-3 data-backed suggestions]
+    
+    Your analysis should be concise but thorough, focusing on actionable insights that can help create a personalized health plan.
+    """,
+            "tools": ["file", "search"],
+            "files": ["journal-app.txt"],
+        },
+        {
+            "name": "HistoricalJournalAnalyst",
+            "model": "gemini-2.0-flash",
+            "description": "This agent specializes in analyzing less structured historical journal entries from earlier time periods, identifying long-term patterns and contextual health information from unformatted data.",
+            "system_message": f"""
+    You analyze historical journal entries that are less structured and from earlier time periods.
+    
+    STEPS TO FOLLOW:
+    {HISTORY_SUMMARY_STEP}
+    2. Analyze the unstructured journal entries for:
+       - Long-term health patterns and chronic issues
+       - Historical triggers that have consistently caused problems
+       - Changes in health conditions over time
+       - Previously attempted treatments and their outcomes
+       - Life events that coincided with health changes
+    3. Compare historical patterns with more recent data
+    4. Identify valuable insights that might not be captured in newer, more structured data
+    
+    FORMAT YOUR RESPONSE:
+    - Historical Patterns: [List 3-5 long-term patterns]
+    - Chronic Issues: [List ongoing health concerns]
+    - Historical Triggers: [List triggers identified over time]
+    - Treatment History: [Summarize what has/hasn't worked historically]
+    - Key Life Context: [Note relevant life circumstances affecting health]
+    
+    Your analysis should focus on extracting valuable historical context that might inform current health planning.
+    """,
+            "tools": ["file", "search"],
+            "files": ["journal-past-summary.md", "journal-past.md"],
+            # Read the raw history while the rollup does not exist (run_team.Team.prepare builds it).
+            "fallbacks": {"journal-past-summary.md": (HISTORY_SUMMARY_STEP, HISTORY_RAW_STEP)},
+        },
+        {
+            "name": "UserInsightsAnalyst",
+            "model": "gemini-2.0-flash",
+            "description": "This agent specializes in analyzing subjective observations, personal patterns, and suggestions directly from the user, extracting meaningful insights from qualitative personal experience data.",
+            "system_message": """
+    You analyze the user's own observations, patterns, and personal insights about their health journey.
+    
+    STEPS TO FOLLOW:
+    1. Use file_tool to access the files 'thought.txt' at ./combine_files/combine/thought.txt
+    2. Analyze the user's subjective experiences for:
+       - Self-identified patterns and correlations
+       - Personal theories about health triggers
+       - Emotional and psychological factors mentioned
+       - User preferences for treatments and lifestyle changes
+       - Self-management strategies the user has found effective
+    3. Pay special attention to the user's own priorities and concerns
+    4. Note any discrepancies between the user's perceptions and other data
+    
+    FORMAT YOUR RESPONSE:
+    - Self-Reported Patterns: [List user-identified patterns]
+    - Personal Triggers: [List triggers the user has identified]
+    - Preferred Approaches: [Note user preferences for management]
+    - Quality of Life Concerns: [Highlight user's priorities]
+    - User Insights: [Capture unique perspectives the user has provided]
+    
+    Your analysis should prioritize the user's voice and subjective experience, as this provides crucial context for creating an acceptable health plan.
+    """,
+            "tools": ["file", "search"],
+            "files": ["thought.txt"],
+        },
+    ],
+}
+
+TRIGGERS_ROUTINE_SELECTOR = """
+Select the most appropriate agent to respond next in this health analysis system.
+
+AGENT ROLES:
+- MainCoordinator: Directs analysis and creates final health plan
+- TriggerAnalyst: Analyzes patterns in triggers and discomfort
+- MorningRoutineAnalyst: Analyzes morning routines and timing
+- SupplementAnalyst: Analyzes supplement and medication interactions
+- DietAnalyst: Analyzes food patterns and recommendations
+
+SELECTION GUIDELINES:
+1. MainCoordinator should always go first
+2. Specialized analysts should only begin after being assigned tasks
+3. Return to MainCoordinator after each analysis
+4. Select User when direct input is needed
+
+Current conversation context:
+{history}
+
+Based on the current state of the conversation, select ONE agent from {participants} to perform the next task.
+"""
+
+TRIGGERS_ROUTINE = {
+    "description": "triggers, morning routine, supplements and diet from the app journal (main2.py)",
+    "task": "Analyze my health journal to identify triggers and create a morning routine plan",
+    "selector_model": "gemini-2.0-flash",
+    "required_sections": ["HEALTH ANALYSIS & RECOMMENDATIONS", "Morning Routine"],
+    "selector_prompt": TRIGGERS_ROUTINE_SELECTOR,
+    "agents": [
+        {
+            "name": "MainCoordinator",
+            "model": "o3-mini",
+            "description": "Main coordinator for health analysis and plan creation",
+            "system_message": """
+    You are the main coordinator for health analysis. Your job is to:
+    1. Direct the analysis process
+    2. Request information from specialized agents
+    3. Create a final health plan based on findings
+
+    Your agents are:
+    - TriggerAnalyst: Analyzes patterns in triggers and discomfort
+    - MorningRoutineAnalyst: Specializes in morning routines and timing
+    - SupplementAnalyst: Analyzes supplement and medication interactions
+    - DietAnalyst: Analyzes food patterns and recommendations
+
+    When assigning tasks, use this format:
+    1. <agent> : <task>
+
+    After all agents complete their tasks, create a comprehensive health plan.
+    
+    FORMAT YOUR HEALTH PLAN:
+    
+    # HEALTH ANALYSIS & RECOMMENDATIONS
+    
+    ## Key Findings
+    [Summary of main patterns and triggers]
+    
+    ## Morning Routine
+    [Detailed morning schedule with timing]
+    
+    ## Supplement Protocol
+    [Supplement timing and combinations]
+    
+    ## Dietary Guidelines
+    [Food recommendations and restrictions]
+    
+    ## Monitoring Plan
+    [How to track and adjust based on symptoms]
+    
+    End with "APPROVE" when complete.
+    """,
+            "tools": [],
+            "files": [],
+        },
+        {
+            "name": "TriggerAnalyst",
+            "model": "gemini-2.0-flash",
+            "description": "Analyzes patterns in triggers and discomfort",
+            "system_message": """
+    You analyze patterns in triggers and discomfort from the journal entries.
+    
+    STEPS:
+    1. Use Journal_Stats for exact rating deltas, lagged correlations and risky pairs,
+       then use file_tool on 'journal-app.txt' with a date range only to read the context of specific days
+    2. Analyze for:
+       - Common triggers of discomfort
+       - Patterns in discomfort ratings
+       - Timing of symptoms
+       - Combinations that worsen symptoms
+    3. Identify most consistent patterns
+    
+    FORMAT:
+    - Common Triggers: [List main triggers]
+    - Timing Patterns: [When symptoms occur]
+    - Rating Patterns: [How ratings change]
+    - Risk Combinations: [Combinations to avoid]
+    """,
+            "tools": ["file", "stats", "search"],
+            "files": ["journal-app.txt"],
+        },
+        {
+            "name": "MorningRoutineAnalyst",
+            "model": "gemini-2.0-flash",
+            "description": "Analyzes morning routines and timing",
+            "system_message": """
+    You analyze morning routines and timing patterns.
+    
+    STEPS:
+    1. Use file_tool to access 'journal-app.txt'
+    2. Analyze for:
+       - Successful morning routines
+       - Timing of medications
+       - Exercise patterns
+       - Breakfast timing and content
+    3. Identify optimal morning patterns
+    
+    FORMAT:
+    - Optimal Timing: [Best times for activities]
+    - Morning Activities: [What works best]
+    - Breakfast Patterns: [Successful breakfasts]
+    - Exercise Timing: [Best exercise timing]
+    """,
+            # The same tools as the other analysts: tool definitions come first in the prompt, so a
+            # different list would keep its prompt from starting with the cached shared prefix.
+            "tools": ["file", "stats", "search"],
+            "files": ["journal-app.txt"],
+        },
+        {
+            "name": "SupplementAnalyst",
+            "model": "gemini-2.0-flash",
+            "description": "Analyzes supplement and medication interactions",
+            "system_message": """
+    You analyze supplement and medication interactions.
+    
+    STEPS:
+    1. Use Journal_Stats with kind 'supplement' and 'med' for exact rating deltas and pairs,
+       then use file_tool on 'journal-app.txt' with a date range only to read the context of specific days
+    2. Analyze for:
+       - Supplement combinations
+       - Medication timing
+       - Interactions between supplements
+       - Successful supplement protocols
+    3. Identify optimal supplement patterns
+    
+    FORMAT:
+    - Core Supplements: [Essential supplements]
+    - Timing Guidelines: [When to take what]
+    - Interactions: [What to avoid combining]
+    - Success Patterns: [What works well together]
+    """,
+            "tools": ["file", "stats", "search"],
+            "files": ["journal-app.txt"],
+        },
+        {
+            "name": "DietAnalyst",
+            "model": "gemini-2.0-flash",
+            "description": "Analyzes food patterns and recommendations",
+            "system_message": """
+    You analyze food patterns and dietary recommendations.
+    
+    STEPS:
+    1. Use Journal_Stats with kind 'food' for exact rating deltas, lagged correlations and pairs,
+       then use file_tool on 'journal-app.txt' with a date range only to read the context of specific days
+    2. Analyze for:
+       - Safe food choices
+       - Problematic foods
+       - Meal timing
+       - Food combinations
+    3. Identify optimal dietary patterns
+    
+    FORMAT:
+    - Safe Foods: [Foods that work well]
+    - Foods to Avoid: [Problematic foods]
+    - Meal Timing: [Best times to eat]
+    - Food Combinations: [What works together]
+    """,
+            "tools": ["file", "stats", "search"],
+            "files": ["journal-app.txt"],
+        },
+    ],
+}
+
+TEAMS = {
+    "health-plan": HEALTH_PLAN,
+    "triggers-routine": TRIGGERS_ROUTINE,
+}
+DEFAULT_TEAM = "health-plan"
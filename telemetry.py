@@ -0,0 +1,191 @@
+import functools
+import json
+import os
+import time
+from contextvars import ContextVar
+
+from autogen_agentchat.messages import BaseChatMessage
+
+from client_wrapper import ClientWrapper
+
+TRACE_DIR = os.getenv("TRACE_DIR", ".traces")
+
+# Agent whose model call ran last in the current task; tool calls are attributed to it.
+current_agent = ContextVar("current_agent", default="-")
+
+
+def tracing_enabled():
+    return os.getenv("TRACE", "1").lower() not in ("0", "false", "no", "off")
+
+
+class Tracer:
+    """Collects timed spans for one run and exports them.
+
+    Spans are model calls (tokens, latency), selector decisions and tool calls
+    (time, bytes returned), each tagged with the agent and the turn it happened
+    in. `export` writes them as JSON lines and as a Chrome trace that
+    chrome://tracing, Perfetto or speedscope can open as a flame chart.
+    """
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.turn = 0
+
+    def record(self, name, cat, agent, start, end, **args):
+        self.spans.append({"name": name, "cat": cat, "agent": agent, "turn": self.turn,
+                           "start": start - self.origin, "dur": end - start, **args})
+
+    async def observe(self, stream):
+        """Pass a run_stream through, counting each chat message as a finished turn."""
+        async for message in stream:
+            if isinstance(message, BaseChatMessage):
+                now = time.perf_counter()
+                self.record("message", "turn", message.source, now, now, bytes=len(message.to_text().encode('utf-8')))
+                self.turn += 1
+            yield message
+
+    def selector(self, selector_func):
+        if selector_func is None:
+            return None
+
+        @functools.wraps(selector_func)
+        def select(messages):
+            start = time.perf_counter()
+            speaker = selector_func(messages)
+            self.record("select", "selector", "selector", start, time.perf_counter(), speaker=speaker or "llm")
+            return speaker
+        return select
+
+    def export(self, directory=TRACE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.run_id)
+        with open(base + ".jsonl", 'w', encoding='utf-8') as file:
+            for span in self.spans:
+                file.write(json.dumps(span) + "\n")
+
+        threads = {}
+        events = []
+        for span in self.spans:
+            tid = threads.setdefault(span["agent"], len(threads) + 1)
+            args = {key: value for key, value in span.items() if key not in ("name", "cat", "agent", "start", "dur")}
+            events.append({"name": span["name"], "cat": span["cat"], "ph": "X" if span["dur"] else "i",
+                           "ts": round(span["start"] * 1e6), "dur": round(span["dur"] * 1e6),
+                           "pid": 1, "tid": tid, "s": "t", "args": args})
+        events += [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": agent}}
+                   for agent, tid in threads.items()]
+        with open(base + ".trace.json", 'w', encoding='utf-8') as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        return base + ".jsonl", base + ".trace.json"
+
+    def summary(self):
+        rows = {}
+        for span in self.spans:
+            row = rows.setdefault(span["agent"], {"model_calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                                  "cached": 0, "model_s": 0.0, "select_calls": 0, "select_s": 0.0,
+                                                  "tool_calls": 0, "tool_s": 0.0, "tool_bytes": 0, "turns": 0})
+            if span["cat"] == "model":
+                row["model_calls"] += 1
+                row["prompt_tokens"] += span.get("prompt_tokens", 0)
+                row["completion_tokens"] += span.get("completion_tokens", 0)
+                row["cached"] += 1 if span.get("cached") else 0
+                row["model_s"] += span["dur"]
+            elif span["cat"] == "selector":
+                row["select_calls"] += 1
+                row["select_s"] += span["dur"]
+            elif span["cat"] == "tool":
+                row["tool_calls"] += 1
+                row["tool_s"] += span["dur"]
+                row["tool_bytes"] += span.get("bytes", 0)
+            elif span["cat"] == "turn":
+                row["turns"] += 1
+        return rows
+
+    def print_summary(self):
+        rows = self.summary()
+        header = f"{'agent':<26}{'turns':>6}{'calls':>7}{'prompt':>9}{'compl':>8}{'cached':>7}{'model s':>9}" \
+                 f"{'select s':>9}{'tools':>6}{'tool s':>8}{'tool KB':>9}"
+        print(header)
+        print("-" * len(header))
+        total = time.perf_counter() - self.origin
+        for agent, row in rows.items():
+            print(f"{agent:<26}{row['turns']:>6}{row['model_calls'] + row['select_calls']:>7}"
+                  f"{row['prompt_tokens']:>9}{row['completion_tokens']:>8}{row['cached']:>7}{row['model_s']:>9.2f}"
+                  f"{row['select_s']:>9.3f}{row['tool_calls']:>6}{row['tool_s']:>8.3f}{row['tool_bytes'] / 1024:>9.1f}")
+        print(f"run {self.run_id}: {self.turn} turns in {total:.1f}s")
+
+
+class TracedClient(ClientWrapper):
+    """Records latency and token usage of every model call made on behalf of `agent`."""
+
+    def __init__(self, client, agent, tracer, cat="model"):
+        super().__init__(client)
+        self.agent = agent
+        self.tracer = tracer
+        self.cat = cat
+
+    def _record(self, start, result):
+        usage = result.usage if result is not None else None
+        self.tracer.record("create", self.cat, self.agent, start, time.perf_counter(),
+                           prompt_tokens=usage.prompt_tokens if usage else 0,
+                           completion_tokens=usage.completion_tokens if usage else 0,
+                           cached=bool(result is not None and result.cached), ok=result is not None)
+
+    async def create(self, messages, **kwargs):
+        current_agent.set(self.agent)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = await self.client.create(messages, **kwargs)
+            return result
+        finally:
+            self._record(start, result)
+
+    def create_stream(self, messages, **kwargs):
+        current_agent.set(self.agent)
+
+        async def stream():
+            start = time.perf_counter()
+            result = None
+            try:
+                async for item in self.client.create_stream(messages, **kwargs):
+                    if not isinstance(item, str):
+                        result = item
+                    yield item
+            finally:
+                self._record(start, result)
+        return stream()
+
+
+def traced(client, agent, tracer, cat="model"):
+    return TracedClient(client, agent, tracer, cat) if tracing_enabled() else client
+
+
+def traced_tool(tool, tracer):
+    """Time every call of `tool` and the size of what it returns."""
+    if not tracing_enabled():
+        return tool
+    run_json = tool.run_json
+
+    async def timed_run_json(args, *rest, **kwargs):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = await run_json(args, *rest, **kwargs)
+            return result
+        finally:
+            size = len(tool.return_value_as_string(result).encode('utf-8')) if result is not None else 0
+            tracer.record(tool.name, "tool", current_agent.get(), start, time.perf_counter(),
+                          bytes=size, args=dict(args))
+    tool.run_json = timed_run_json
+    return tool
+
+
+def finish(tracer):
+    """Print the per-agent summary and write the trace files, unless TRACE=0."""
+    if not tracing_enabled():
+        return
+    tracer.print_summary()
+    jsonl, chrome = tracer.export()
+    print(f"trace written to {jsonl} and {chrome}")
@@ -0,0 +1,42 @@
+from findings import file_state, plan_analyst
+
+DAYS = {"2024-03-01": "Rating: 3\nLunch: rice", "2024-03-02": "Rating: 2\nLunch: soup"}
+
+
+def write_journal(path, days):
+    with open(path, 'w', encoding='utf-8') as file:
+        for iso_date, body in days.items():
+            file.write(f"=={iso_date}==\n{body}\n\n")
+    return str(path)
+
+
+def record_for(path):
+    # Findings stored just now, covering the journal as it is.
+    return {"findings": "-", "files": {"journal-app.txt": file_state(path)},
+            "full_at": "2999-01-01T00:00:00"}
+
+
+def test_unchanged_journal_reuses_findings(tmp_path):
+    path = write_journal(tmp_path / "journal-app.txt", DAYS)
+    record = record_for(path)
+
+    assert plan_analyst(record, {"journal-app.txt": path}, {"journal-app.txt": file_state(path)}) == ("reuse", {})
+
+
+def test_new_day_is_a_delta(tmp_path):
+    path = write_journal(tmp_path / "journal-app.txt", DAYS)
+    record = record_for(path)
+    write_journal(path, {**DAYS, "2024-03-03": "Rating: 1"})
+
+    mode, new = plan_analyst(record, {"journal-app.txt": path}, {"journal-app.txt": file_state(path)})
+    assert (mode, new) == ("delta", {"journal-app.txt": "2024-03-02"})
+
+
+def test_same_length_edit_of_an_analyzed_day_is_full(tmp_path):
+    path = write_journal(tmp_path / "journal-app.txt", DAYS)
+    record = record_for(path)
+    before = file_state(path)
+    write_journal(path, {**DAYS, "2024-03-01": "Rating: 4\nLunch: rice"})
+
+    assert file_state(path) != before
+    assert plan_analyst(record, {"journal-app.txt": path}, {"journal-app.txt": file_state(path)})[0] == "full"
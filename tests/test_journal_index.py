@@ -0,0 +1,37 @@
+import pytest
+
+from journal_index import read_window
+
+TEXT = "==March 01 2024==\n" + "temp 38°C, café, 😀 ñ\n" * 40 + "==March 02 2024==\nSleep: 7h\n"
+
+
+@pytest.mark.parametrize("max_bytes", range(1, 64))
+def test_pages_never_split_a_character(tmp_path, max_bytes):
+    path = tmp_path / "journal-app.txt"
+    path.write_text(TEXT, encoding='utf-8')
+
+    pages, offset = [], 0
+    while offset is not None:
+        window = read_window(str(path), offset=offset, max_bytes=max_bytes)
+        pages.append(window["content"])
+        offset = window["next_offset"]
+
+    assert "".join(pages) == TEXT
+
+
+@pytest.mark.parametrize("max_bytes", [1, 2, 3])
+def test_windows_smaller_than_a_character_return_it_whole(tmp_path, max_bytes):
+    path = tmp_path / "thought.txt"
+    path.write_text("😀°é", encoding='utf-8')
+
+    pages, offset = [], 0
+    while offset is not None:
+        window = read_window(str(path), offset=offset, max_bytes=max_bytes)
+        end = window["next_offset"] if window["next_offset"] is not None else window["total"]
+        # Every byte read is in the content, and every window moves on.
+        assert len(window["content"].encode('utf-8')) == end - offset > 0
+        pages.append(window["content"])
+        offset = window["next_offset"]
+
+    assert pages[0] == "😀"
+    assert "".join(pages) == "😀°é"
@@ -0,0 +1,124 @@
+import os
+import re
+from datetime import date, timedelta
+
+import pytest
+
+from journal_index import read_window
+from journal_normalize import NOTE, dated_entries, expand, normalize, normalized_path, split, update, with_context
+
+DAYS = [
+    ("March 01 2024", "Supplements: magnesium 200mg; vitamin d\nSleep: 7h\n12:28 Lunch: rice\nfelt tired in the afternoon"),
+    ("March 02 2024", "Supplements: magnesium 200mg; vitamin d\nSleep:   6h  \n\n\n12:28 Lunch: rice\n"
+                      "felt tired in the afternoon\nfelt tired in the afternoon\nfelt tired in the afternoon"),
+    # Identical to March 01 once whitespace is collapsed.
+    ("March 03 2024", "Supplements:  magnesium 200mg; vitamin d \nSleep: 7h\n12:28 Lunch: rice\nfelt tired in the afternoon"),
+    ("March 04 2024", "Supplements: magnesium 200mg; vitamin d\n12:28 Lunch: rice\nfelt tired in the afternoon\n"
+                      "  indented line with a § in it\nNote: §1\n§2\nsaw [x2]\nsaw [x2]\nwrote this twice [x2]\n"
+                      "\\starts with the escape"),
+    ("March 05 2024", "same as 2024-03-01"),
+    ("March 06 2024", "same as 2024-01-01\nnot a reference"),
+    ("March 07 2024", ""),
+    ("March 08 2024", "Supplements: magnesium 200mg; vitamin d\nSleep: 7h\n12:28 Lunch: rice\nfelt tired in the afternoon"),
+]
+
+
+def write_journal(path, days):
+    with open(path, 'w', encoding='utf-8') as file:
+        for header, body in days:
+            file.write(f"=={header}==\n{body}\n\n")
+    return path
+
+
+def weeks(count):
+    """DAYS repeated `count` times on consecutive dates, so every value recurs across weeks."""
+    start = date(2024, 3, 1)
+    bodies = [body for _, body in DAYS] * count
+    return [((start + timedelta(days=i)).strftime("%B %d %Y"), body) for i, body in enumerate(bodies)]
+
+
+def words(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return write_journal(str(tmp_path / "journal-app.txt"), weeks(3))
+
+
+def test_round_trip_keeps_every_dated_fact(journal):
+    entries = dated_entries(journal)
+    text, references, codes = normalize(entries)
+
+    assert references and codes
+    assert expand(text) == entries
+    # Against the raw journal too, not only its canonical form: nothing but whitespace may change.
+    raw = [body for _, body in weeks(3)]
+    assert [words("\n".join(lines)) for _, lines in expand(text)] == [words(body) for body in raw]
+
+
+def test_markers_written_literally_are_escaped(journal):
+    text, _, _ = normalize(dated_entries(journal))
+    body = text.split("==2024-03-04==\n", 1)[1].split("\n==", 1)[0]
+
+    assert "\\Note: §1" in body
+    assert "\\§2" in body
+    assert "saw [x2] [x2]" in body
+    assert "wrote this twice [x2] [x1]" in body
+    assert "\\\\starts with the escape" in body
+    expanded = dict(expand(text))
+    assert expanded["2024-03-05"] == ["same as 2024-03-01"]
+    assert expanded["2024-03-06"] == ["same as 2024-01-01", "not a reference"]
+
+
+def test_repeats_and_references(journal):
+    text, _, _ = normalize(dated_entries(journal))
+
+    assert "==2024-03-03==\nsame as 2024-03-01" in text
+    assert re.search(r'^(§\d+|felt tired in the afternoon) \[x3\]$', text, re.M)
+
+
+def test_timestamped_lines_are_not_coded(journal):
+    text, _, _ = normalize(dated_entries(journal))
+    codes = [line.split(" = ", 1)[1] for line in text.split("\n") if re.match(r'^§\d+ = ', line)]
+
+    assert "magnesium 200mg; vitamin d" in codes
+    assert "felt tired in the afternoon" in codes
+    assert not any(re.search(r'\d{1,2}:\d{2}', value) for value in codes)
+    assert "12:28 Lunch: rice" in text.split(NOTE, 1)[1]
+
+
+def test_windows_get_the_codes_and_days_they_reference(journal):
+    result = update(journal)
+    norm = normalized_path(journal)
+    entries = dict(dated_entries(journal))
+
+    assert result is not None and os.path.isfile(norm)
+    # The last days only reference codes and a day defined before the window.
+    window = read_window(norm, limit=4, max_bytes=0)
+    content = with_context(norm, window["content"])
+    expanded = dict(expand(content))
+    for iso_date in window["dates"]:
+        assert expanded[iso_date] == entries[iso_date]
+
+
+def test_unverifiable_journal_is_read_as_it_is(tmp_path):
+    path = write_journal(str(tmp_path / "thought.txt"), [("not a date", "text")])
+
+    assert update(path) is None
+    assert not os.path.exists(normalized_path(path))
+
+
+def test_context_is_parsed_once_per_version_of_the_file(journal, monkeypatch):
+    import journal_normalize
+
+    update(journal)
+    norm = normalized_path(journal)
+    window = read_window(norm, limit=4, max_bytes=0)["content"]
+    first = with_context(norm, window)
+    reads = []
+    monkeypatch.setattr(journal_normalize, "split", lambda text: reads.append(text) or split(text))
+
+    assert with_context(norm, window) == first
+    # Only the window itself was parsed, not the whole journal again.
+    assert reads == [window]
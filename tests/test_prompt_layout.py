@@ -0,0 +1,34 @@
+import asyncio
+from types import SimpleNamespace
+
+import prompt_layout
+from prompt_layout import record_provider_usage
+
+
+class Response:
+    """What the hook reads of an httpx response."""
+
+    def __init__(self, path, usage):
+        self.status_code = 200
+        self.url = SimpleNamespace(path=f"/v1{path}")
+        self.headers = {"content-type": "application/json"}
+        self.usage = usage
+
+    async def aread(self):
+        pass
+
+    def json(self):
+        return {"usage": self.usage}
+
+
+def test_provider_cached_tokens_are_counted(monkeypatch):
+    monkeypatch.setattr(prompt_layout, "provider_usage",
+                        {"responses": 0, "prompt_tokens": 0, "cached_tokens": 0, "reported": 0})
+
+    for path, usage in [("/chat/completions", {"prompt_tokens": 3000, "prompt_tokens_details": {"cached_tokens": 2048}}),
+                        ("/chat/completions", {"prompt_tokens": 1000}),
+                        ("/embeddings", {"prompt_tokens": 500, "prompt_tokens_details": {"cached_tokens": 500}})]:
+        asyncio.run(record_provider_usage(Response(path, usage)))
+
+    assert prompt_layout.provider_usage == {"responses": 2, "prompt_tokens": 4000, "cached_tokens": 2048,
+                                            "reported": 1}
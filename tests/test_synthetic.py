@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks.synthetic import SPANS, parse_span
+
+
+def test_spans_in_days_months_and_years():
+    assert {span: parse_span(span) for span in SPANS} == SPANS
+    assert [parse_span(span) for span in ("2m", "4y", "90d", "45")] == [60, 1461, 90, 45]
+
+
+@pytest.mark.parametrize("span", ["2w", "0m", "m", "-3", ""])
+def test_invalid_spans_are_rejected(span):
+    with pytest.raises(ValueError, match="invalid span"):
+        parse_span(span)
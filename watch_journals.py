@@ -0,0 +1,228 @@
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import signal
+import struct
+import sys
+import time
+
+import rename_md
+from combine_engine import SOURCES, refresh
+
+FILES_DIR = "combine_files/files"
+DEBOUNCE = 0.3
+MAX_DELAY = 1.0
+POLL_INTERVAL = 0.5
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT = struct.Struct("iIII")
+
+# In-place edits are picked up once the file is closed, not on every write of a save in progress.
+FILE_EVENTS = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF
+DIR_EVENTS = IN_CREATE | IN_MOVED_TO
+
+
+def source_dirs():
+    return {name: spec.directory for name, spec in SOURCES.items()}
+
+
+def relevant(file_name):
+    # Editor swap and backup files, and the engine's own temp files.
+    return not (file_name.startswith(".") or file_name.endswith(("~", ".swp", ".tmp")))
+
+
+class InotifyWatcher:
+    """Linux inotify on every source directory, and on their parent to see
+    source directories that are created later. `wait` returns the names of the
+    sources with changes, or an empty set on timeout."""
+
+    def __init__(self, directories, parent=FILES_DIR):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = directories
+        self.parent = parent
+        self.watches = {}
+        self.parent_wd = self.add_watch(parent, DIR_EVENTS) if os.path.isdir(parent) else None
+        for name, directory in directories.items():
+            if os.path.isdir(directory):
+                self.watches[self.add_watch(directory, FILE_EVENTS)] = name
+
+    def add_watch(self, path, mask):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def wait(self, timeout=None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, offset)
+                name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0").decode(errors="replace")
+                offset += EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(self.directories)
+                elif wd == self.parent_wd:
+                    self.source_created(name, changed)
+                elif mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                elif wd in self.watches and (mask & IN_DELETE_SELF or relevant(name)):
+                    changed.add(self.watches[wd])
+
+    def source_created(self, dir_name, changed):
+        for name, directory in self.directories.items():
+            if os.path.normpath(os.path.join(self.parent, dir_name)) == os.path.normpath(directory) \
+                    and name not in self.watches.values() and os.path.isdir(directory):
+                self.watches[self.add_watch(directory, FILE_EVENTS)] = name
+                changed.add(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback for systems without inotify: compares directory listings and
+    file stats every `interval` seconds."""
+
+    def __init__(self, directories, interval=POLL_INTERVAL):
+        self.directories = directories
+        self.interval = interval
+        self.snapshots = {name: self.snapshot(directory) for name, directory in directories.items()}
+
+    def snapshot(self, directory):
+        if not os.path.isdir(directory):
+            return None
+        snapshot = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not relevant(entry.name):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    # Deleted or renamed since the listing; the next snapshot sees where it went.
+                    continue
+                snapshot[entry.name] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if end is None else max(0.0, min(self.interval, end - time.monotonic())))
+            changed = set()
+            for name, directory in self.directories.items():
+                snapshot = self.snapshot(directory)
+                if snapshot != self.snapshots[name]:
+                    self.snapshots[name] = snapshot
+                    changed.add(name)
+            if changed or end is not None and time.monotonic() >= end:
+                return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(directories, poll=False):
+    if not poll:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling every {POLL_INTERVAL}s")
+    return PollingWatcher(directories)
+
+
+def ingest(names):
+    """Normalizes new journal-past exports, then recombines `names` and their derived indexes."""
+    start = time.perf_counter()
+    if "journal-past" in names and os.path.isdir(SOURCES["journal-past"].directory):
+        renamed = rename_md.rename_all(SOURCES["journal-past"].directory)
+        if renamed:
+            print(f"renamed {len(renamed)} journal-past exports")
+    refresh(sorted(names))
+    print(f"ingested {', '.join(sorted(names))} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+def try_ingest(names):
+    """`ingest`, logging a failure instead of raising it; returns the names that still need ingesting."""
+    try:
+        ingest(names)
+    except Exception as e:
+        print(f"ingesting {', '.join(sorted(names))} failed ({type(e).__name__}: {e}), retrying on the next change")
+        return set(names)
+    return set()
+
+
+def watch(poll=False, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+    """Keeps the combined journals and indexes up to date until interrupted.
+
+    Changes are collected until `debounce` seconds pass without a new one, or
+    `max_delay` seconds after the first, and then ingested together, so a burst
+    of copied or synced files costs one combine per source. Sources that fail
+    to ingest are kept and tried again with the next change.
+    """
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    directories = source_dirs()
+    failed = try_ingest(set(directories))
+    watcher = make_watcher(directories, poll)
+    print(f"watching {', '.join(directories.values())} ({type(watcher).__name__}), Ctrl-C to stop")
+    pending = set()
+    first = last = 0.0
+    try:
+        while True:
+            timeout = None if not pending else max(0.0, min(last + debounce, first + max_delay) - time.monotonic())
+            changed = watcher.wait(timeout)
+            now = time.monotonic()
+            if changed:
+                if not pending:
+                    first = now
+                pending |= changed | failed
+                failed = set()
+                last = now
+            if pending and now >= min(last + debounce, first + max_delay):
+                failed = try_ingest(pending)
+                pending = set()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the combined journals and their indexes up to date")
+    parser.add_argument("--poll", action="store_true", help="poll instead of using inotify")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE, help="quiet seconds before ingesting")
+    parser.add_argument("--max-delay", type=float, default=MAX_DELAY, help="longest wait after the first change")
+    parser.add_argument("--once", action="store_true", help="ingest everything once and exit")
+    args = parser.parse_args()
+    if args.once:
+        ingest(set(source_dirs()))
+        return
+    watch(args.poll, args.debounce, args.max_delay)
+
+
+if __name__ == "__main__":
+    main()